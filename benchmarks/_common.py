@@ -0,0 +1,89 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: 基准测试公共工具: 计时、SQLite 会话和示例模型
+
+在仓库根目录下执行 `python benchmarks/<name>.py`；设置 PYTHONPATH 时优先导入其中的 yz_utils
+"""
+import datetime
+import decimal
+import enum
+import os
+import sys
+import time
+import uuid
+import warnings
+from typing import Callable, Tuple
+
+# 当前仓库排在 PYTHONPATH 之后，可用 PYTHONPATH 指向另一份代码做对比
+sys.path.insert(
+    1 + len([p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]),
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import (  # noqa: E402
+    Column, DateTime, Enum, ForeignKey, Integer, Numeric, String, create_engine
+)
+from sqlalchemy.exc import SAWarning  # noqa: E402
+from sqlalchemy.orm import Session, relationship, sessionmaker  # noqa: E402
+
+from yz_utils.db.orm_crud_base import Base  # noqa: E402
+
+# SQLite 没有原生 Decimal，示例模型的 Numeric 列会触发该警告
+warnings.filterwarnings("ignore", category=SAWarning, message=".*Decimal objects")
+
+
+class Color(enum.Enum):
+    red = "red"
+    green = "green"
+
+
+class BenchUser(Base):
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+
+
+class BenchItem(Base):
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), index=True)
+    price = Column(Numeric(10, 2))
+    color = Column(Enum(Color))
+    token = Column(String(36))
+    created_at = Column(DateTime, index=True, nullable=False)
+    owner_id = Column(Integer, ForeignKey("benchuser.id"))
+    owner = relationship(BenchUser)
+
+
+def make_item_data(i: int) -> dict:
+    return dict(
+        id=i + 1,
+        name="item-%d" % i,
+        price=decimal.Decimal("%d.%02d" % (i % 1000, i % 100)),
+        color=Color.red if i % 2 else Color.green,
+        token=str(uuid.UUID(int=i)),
+        created_at=datetime.datetime(2020, 1, 1) + datetime.timedelta(seconds=i),
+        owner_id=None,
+    )
+
+
+def make_session(url: str = "sqlite://", echo: bool = False) -> Session:
+    engine = create_engine(url, echo=echo)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def timed(fn: Callable, repeat: int = 3) -> Tuple[float, object]:
+    """执行 repeat 次，返回最短耗时(秒)和最后一次的结果"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(name: str, seconds: float, n: int = 1):
+    rate = n / seconds if seconds else float("inf")
+    print("%-40s %10.4fs %14.0f ops/s" % (name, seconds, rate))
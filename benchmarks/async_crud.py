@@ -0,0 +1,171 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: AsyncCRUDBase + asyncio.gather vs CRUDBase + 线程池 的吞吐和延迟
+
+两边都读同一个 SQLite 文件，连接池大小等于并发数，每个并发任务使用自己的 Session:
+    * async: aiosqlite，asyncio.gather 同时发起 concurrency 个 get/list
+    * threads: ThreadPoolExecutor(concurrency)，loop.run_in_executor 调用同步 CRUDBase
+
+aiosqlite 内部也是每个连接一个线程，本地 SQLite 上 async 多了一次线程间转发，
+这里主要用于对比开销；asyncpg 等原生异步驱动在网络延迟下才体现并发优势
+
+计时前先在单独的 SQLite 文件上用 aiosqlite 执行各个方法，与 CRUDBase 的结果对比
+
+python benchmarks/async_crud.py --calls 5000 --concurrency 1 16 64
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from _common import BenchItem, make_item_data, make_session
+from yz_utils.db.async_crud_base import AsyncCRUDBase
+from yz_utils.db.orm_crud_base import CRUDBase
+
+
+def summarize(name: str, seconds: float, latencies: list):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print("%-28s %10.0f ops/s   p50 %7.2fms   p99 %7.2fms" % (
+        name, len(latencies) / seconds,
+        statistics.median(latencies) * 1000, p99 * 1000))
+
+
+async def check(path: str):
+    """AsyncCRUDBase 的结果与同一文件上 CRUDBase 读到的一致"""
+    make_session("sqlite:///" + path).close()
+    engine = create_async_engine("sqlite+aiosqlite:///" + path)
+    make = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    crud = AsyncCRUDBase(BenchItem)
+    async with make() as db:
+        assert await crud.create_many(
+            db, data=[make_item_data(i) for i in range(100)]) == 100
+        pks = await crud.create_many(
+            db, data=[make_item_data(i) for i in range(100, 110)],
+            return_pks=True)
+        assert sorted(pks) == list(range(101, 111)), pks
+        assert await crud.count(db) == 110
+        assert (await crud.get(db, 5)).name == "item-4"
+        assert await crud.get(db, 999) is None
+        assert [obj and obj.id for obj in await crud.get_many(db, [3, 999, 1])] \
+            == [3, None, 1]
+        assert [obj.id for obj in await crud.list(
+            db, sort=["id desc"], limit=3)] == [110, 109, 108]
+        # 第二行缺少 price 等列，不应被更新为 NULL
+        assert await crud.upsert_many(db, data=[make_item_data(200), {
+            "id": 1, "name": "upserted",
+            "created_at": make_item_data(0)["created_at"],
+        }]) == 2
+        assert await crud.update(db, id=2, data={"name": "updated"}) == 1
+        assert await crud.update_many(db, ids=[3, 4], data={"name": "many"}) == 2
+        assert await crud.update_many(db, ids=[3], data={}) == 0
+        assert await crud.delete(db, id=5) == 1
+    await engine.dispose()
+
+    db = make_session("sqlite:///" + path)
+    sync_crud = CRUDBase(BenchItem)
+    assert sync_crud.count(db) == 110
+    assert sync_crud.get(db, 5) is None
+    assert sync_crud.get(db, 201).name == "item-200"
+    first = sync_crud.get(db, 1)
+    assert (first.name, first.price) == ("upserted", make_item_data(0)["price"])
+    assert [obj.name for obj in sync_crud.get_many(db, [2, 3, 4])] \
+        == ["updated", "many", "many"]
+    db.close()
+
+
+async def run_async(url, op, calls, concurrency, rows):
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///" + url, poolclass=AsyncAdaptedQueuePool,
+        pool_size=concurrency)
+    make = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    crud = AsyncCRUDBase(BenchItem)
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(i):
+        async with semaphore:
+            start = time.perf_counter()
+            async with make() as db:
+                if op == "get":
+                    await crud.get(db, i % rows + 1)
+                else:
+                    await crud.list(db, offset=i % rows, limit=20)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[call(i) for i in range(calls)])
+    seconds = time.perf_counter() - start
+    await engine.dispose()
+    return seconds, latencies
+
+
+async def run_threads(url, op, calls, concurrency, rows):
+    engine = create_engine(
+        "sqlite:///" + url, poolclass=QueuePool, pool_size=concurrency,
+        connect_args={"check_same_thread": False})
+    make = sessionmaker(bind=engine, expire_on_commit=False)
+    crud = CRUDBase(BenchItem)
+    latencies = []
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def blocking(i):
+        with make() as db:
+            if op == "get":
+                crud.get(db, i % rows + 1)
+            else:
+                crud.list(db, offset=i % rows, limit=20)
+
+    async def call(executor, i):
+        async with semaphore:
+            start = time.perf_counter()
+            await loop.run_in_executor(executor, blocking, i)
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        await asyncio.gather(*[call(executor, i) for i in range(calls)])
+        seconds = time.perf_counter() - start
+    engine.dispose()
+    return seconds, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "async.db")
+        db = make_session("sqlite:///" + path)
+        CRUDBase(BenchItem).create_many(
+            db, data=[make_item_data(i) for i in range(args.rows)])
+        db.close()
+        asyncio.run(check(os.path.join(tmp, "check.db")))
+
+        for op in ("get", "list"):
+            for concurrency in args.concurrency:
+                print("== %s, concurrency %d" % (op, concurrency))
+                for name, runner in (("async gather", run_async),
+                                     ("thread pool", run_threads)):
+                    seconds, latencies = asyncio.run(runner(
+                        path, op, args.calls, concurrency, args.rows))
+                    summarize(name, seconds, latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: 多次写入的请求耗时: 每次写入自动提交 vs CRUDBase.batch 工作单元(SQLite 文件库)
+
+python benchmarks/batch_writes.py --requests 100 --writes 10
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from _common import BenchItem, make_item_data, make_session, report
+from yz_utils.db.orm_crud_base import CRUDBase
+
+
+def handle_request(crud: CRUDBase, db, start: int, writes: int):
+    """模拟一个请求: 创建 writes 行，更新其中一半，删除一行"""
+    created = [crud.create(db, data=make_item_data(start + i))
+               for i in range(writes)]
+    for obj in created[:writes // 2]:
+        crud.update(db, obj=obj, data={"name": "updated"}, is_return_obj=True)
+    crud.delete(db, id=created[-1].id)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--writes", type=int, default=10)
+    args = parser.parse_args()
+
+    crud = CRUDBase(BenchItem)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("autocommit", "batch"):
+            db = make_session("sqlite:///%s" % os.path.join(tmp, name + ".db"))
+            latencies = []
+            for r in range(args.requests):
+                start = time.perf_counter()
+                if name == "batch":
+                    with crud.batch(db):
+                        handle_request(crud, db, r * args.writes, args.writes)
+                else:
+                    handle_request(crud, db, r * args.writes, args.writes)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            report("%s mean" % name, sum(latencies) / len(latencies))
+            report("%s p95" % name, latencies[int(len(latencies) * 0.95)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: jsonable_encoder 与 jsonable_encoder_bulk 在同构行列表上的对比
+
+python benchmarks/bulk_encoder.py --rows 10000 100000
+"""
+import argparse
+import datetime
+import decimal
+import uuid
+
+from pydantic import BaseModel
+
+from _common import BenchItem, Color, make_item_data, report, timed
+from yz_utils.db.encoders import jsonable_encoder, jsonable_encoder_bulk
+
+
+class ItemSchema(BaseModel):
+    id: int
+    name: str
+    price: decimal.Decimal
+    color: Color
+    token: uuid.UUID
+    created_at: datetime.datetime
+    owner_id: int = None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n in args.rows:
+        dicts = [make_item_data(i) for i in range(n)]
+        payloads = {
+            "dict": dicts,
+            "pydantic": [ItemSchema(**d) for d in dicts],
+            "orm": [BenchItem(**d) for d in dicts],
+        }
+        print("== %d rows" % n)
+        for kind, rows in payloads.items():
+            base, expected = timed(lambda: jsonable_encoder(rows), args.repeat)
+            bulk, result = timed(lambda: jsonable_encoder_bulk(rows), args.repeat)
+            assert result == expected, kind
+            cols, _ = timed(
+                lambda: jsonable_encoder_bulk(rows, orient="columns"), args.repeat
+            )
+            report("%s jsonable_encoder" % kind, base, n)
+            report("%s bulk records (x%.1f)" % (kind, base / bulk), bulk, n)
+            report("%s bulk columns (x%.1f)" % (kind, base / cols), cols, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: CRUDBase.create 逐行插入 vs create_many/upsert_many 批量插入(SQLite 文件库)
+
+另含列名与属性名不同(Column("title_col"))的模型，检查批量写入的值都落到对应列
+
+python benchmarks/create_many.py --rows 5000 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import Column, Integer, String, text
+
+from _common import BenchItem, make_item_data, make_session, report
+from yz_utils.db.orm_crud_base import Base, CRUDBase
+
+
+class BenchRenamed(Base):
+    id = Column(Integer, primary_key=True)
+    title = Column("title_col", String(50), nullable=False)
+    rank = Column("rank_col", Integer)
+
+
+def run_renamed(rows: int, fresh):
+    crud = CRUDBase(BenchRenamed)
+    data = [{"id": i + 1, "title": "t-%d" % i, "rank": i} for i in range(rows)]
+    for name, kwargs in (
+            ("create_many renamed", {}),
+            ("create_many(return_pks) renamed", {"return_pks": True}),
+    ):
+        db = fresh(name.replace(" ", "-"))
+        start = time.perf_counter()
+        crud.create_many(db, data=data, **kwargs)
+        report(name, time.perf_counter() - start, rows)
+        assert db.execute(text(
+            "SELECT count(*) FROM benchrenamed WHERE title_col IS NOT NULL "
+            "AND rank_col IS NOT NULL")).scalar() == rows
+
+    # 只含 title 的行不应把 rank_col 更新为 NULL
+    start = time.perf_counter()
+    crud.upsert_many(db, data=[
+        {"id": item["id"], "title": "u-%d" % item["rank"]} for item in data])
+    report("upsert_many renamed", time.perf_counter() - start, rows)
+    assert db.execute(text(
+        "SELECT count(*) FROM benchrenamed WHERE title_col LIKE 'u-%' "
+        "AND rank_col IS NOT NULL")).scalar() == rows
+
+
+def run(rows: int, per_row: bool):
+    crud = CRUDBase(BenchItem)
+    data = [make_item_data(i) for i in range(rows)]
+    with tempfile.TemporaryDirectory() as tmp:
+        def fresh(name):
+            return make_session("sqlite:///%s" % os.path.join(tmp, name + ".db"))
+
+        print("== %d rows" % rows)
+        if per_row:
+            db = fresh("create")
+            start = time.perf_counter()
+            for item in data:
+                crud.create(db, data=item)
+            base = time.perf_counter() - start
+            report("create (per row)", base, rows)
+
+        for name, kwargs in (
+                ("create_many", {}),
+                ("create_many(return_pks)", {"return_pks": True}),
+        ):
+            db = fresh(name)
+            start = time.perf_counter()
+            crud.create_many(db, data=data, **kwargs)
+            report(name, time.perf_counter() - start, rows)
+
+        db = fresh("upsert")
+        crud.create_many(db, data=data[:rows // 2])
+        start = time.perf_counter()
+        crud.upsert_many(db, data=data)
+        report("upsert_many (50% conflicts)", time.perf_counter() - start, rows)
+
+        run_renamed(rows, fresh)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[5000, 100000])
+    parser.add_argument("--per-row-limit", type=int, default=10000,
+                        help="超过该行数时跳过逐行 create")
+    args = parser.parse_args()
+    for rows in args.rows:
+        run(rows, rows <= args.per_row_limit)
+
+
+if __name__ == "__main__":
+    main()
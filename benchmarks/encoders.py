@@ -0,0 +1,261 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: jsonable_encoder 基准与性能剖析
+
+每个用例输出 ops/s、单次调用的内存分配(tracemalloc)和峰值内存；
+结果可保存为 json，在不同提交之间对比；始终运行同一份脚本，
+用 PYTHONPATH 指向另一份代码(如 git worktree)的根目录:
+
+    git worktree add ../yz-base <base-commit>
+    PYTHONPATH=../yz-base python benchmarks/encoders.py --json base.json
+    python benchmarks/encoders.py --compare base.json
+
+被测代码不支持的用例(缺少 jsonable_encoder_bulk、memoize 等参数)会被跳过
+
+--profile DIR 为每个用例额外输出 cProfile 结果(DIR/<case>.prof)
+"""
+import argparse
+import cProfile
+import datetime
+import decimal
+import enum
+import inspect
+import json
+import os
+import platform
+import pstats
+import time
+import tracemalloc
+import uuid
+from typing import Any, Callable, Dict, List
+
+from pydantic import BaseModel
+
+from _common import BenchItem, BenchUser, make_item_data
+from yz_utils.db import encoders
+
+# 旧版本没有的接口在运行时解析，对应用例跳过
+jsonable_encoder = encoders.jsonable_encoder
+jsonable_encoder_bulk = getattr(encoders, "jsonable_encoder_bulk", None)
+ENCODER_PARAMS = inspect.signature(jsonable_encoder).parameters
+
+
+def supports(*params: str) -> bool:
+    return all(param in ENCODER_PARAMS for param in params)
+
+
+class Level(enum.Enum):
+    low = 1
+    high = 2
+
+
+class Money:
+    def __init__(self, cents: int):
+        self.cents = cents
+
+
+class OrderSchema(BaseModel):
+    id: int
+    amount: Money
+    created_at: datetime.datetime
+    tags: List[str]
+
+    class Config:
+        arbitrary_types_allowed = True
+        json_encoders = {Money: lambda m: "%d.%02d" % divmod(m.cents, 100)}
+
+
+def _deep(depth: int) -> Dict[str, Any]:
+    node: Dict[str, Any] = {"leaf": True}
+    for i in range(depth):
+        node = {"level": i, "child": node, "items": [i, str(i)]}
+    return node
+
+
+def _orm_items(n: int) -> List[BenchItem]:
+    owner = BenchUser(id=1, name="owner")
+    items = []
+    for i in range(n):
+        item = BenchItem(**make_item_data(i))
+        item.owner = owner
+        items.append(item)
+    return items
+
+
+def build_cases() -> Dict[str, Callable[[], Callable[[], Any]]]:
+    """用例名 -> 构造函数，构造函数返回一次待计时的调用，被测代码不支持时返回 None"""
+
+    def deep_nesting():
+        payload = _deep(200)
+        return lambda: jsonable_encoder(payload)
+
+    def wide_dict():
+        payload = {"key_%d" % i: i for i in range(5000)}
+        return lambda: jsonable_encoder(payload)
+
+    def pydantic_json_encoders():
+        payload = [
+            OrderSchema(
+                id=i, amount=Money(i * 7), tags=["a", "b"],
+                created_at=datetime.datetime(2020, 1, 1),
+            )
+            for i in range(500)
+        ]
+        return lambda: jsonable_encoder(payload)
+
+    def orm_objects():
+        payload = _orm_items(1000)
+        return lambda: jsonable_encoder(payload)
+
+    def orm_objects_bulk():
+        if jsonable_encoder_bulk is None:
+            return None
+        payload = _orm_items(1000)
+        return lambda: jsonable_encoder_bulk(payload)
+
+    def shared_subobjects():
+        owner = {"id": 1, "profile": _deep(20), "created_at": datetime.datetime.now()}
+        payload = [{"id": i, "owner": owner} for i in range(1000)]
+        return lambda: jsonable_encoder(payload)
+
+    def shared_subobjects_memo():
+        if not supports("memoize"):
+            return None
+        owner = {"id": 1, "profile": _deep(20), "created_at": datetime.datetime.now()}
+        payload = [{"id": i, "owner": owner} for i in range(1000)]
+        return lambda: jsonable_encoder(payload, memoize=True)
+
+    def orm_graph_memo():
+        if not supports("memoize", "orm_relationships"):
+            return None
+        payload = _orm_items(1000)
+        return lambda: jsonable_encoder(
+            payload, orm_relationships=True, memoize=True)
+
+    def scalar_types():
+        payload = [
+            {
+                "dt": datetime.datetime(2020, 1, 1, 12, i % 60),
+                "d": datetime.date(2020, 1, 1),
+                "dec": decimal.Decimal("%d.25" % i),
+                "uuid": uuid.UUID(int=i),
+                "enum": Level.high if i % 2 else Level.low,
+            }
+            for i in range(1000)
+        ]
+        return lambda: jsonable_encoder(payload)
+
+    def generators():
+        return lambda: jsonable_encoder(
+            ({"i": i, "s": str(i)} for i in range(2000))
+        )
+
+    return {
+        "deep_nesting": deep_nesting,
+        "wide_dict": wide_dict,
+        "pydantic_json_encoders": pydantic_json_encoders,
+        "orm_objects": orm_objects,
+        "orm_objects_bulk": orm_objects_bulk,
+        "shared_subobjects": shared_subobjects,
+        "shared_subobjects_memo": shared_subobjects_memo,
+        "orm_graph_memo": orm_graph_memo,
+        "scalar_types": scalar_types,
+        "generators": generators,
+    }
+
+
+def measure(call: Callable[[], Any], min_time: float) -> Dict[str, float]:
+    call()  # 预热
+    loops = 0
+    start = time.perf_counter()
+    while True:
+        call()
+        loops += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    if hasattr(tracemalloc, "reset_peak"):  # 3.9+
+        tracemalloc.reset_peak()
+    base_current, _ = tracemalloc.get_traced_memory()
+    result = call()
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(
+        stat.count_diff for stat in after.compare_to(before, "filename")
+        if stat.count_diff > 0
+    )
+    del result
+    return {
+        "ops_per_sec": loops / elapsed,
+        "alloc_blocks": blocks,
+        "alloc_kib": (current - base_current) / 1024,
+        "peak_kib": (peak - base_current) / 1024,
+    }
+
+
+def profile(name: str, call: Callable[[], Any], out_dir: str, top: int):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "%s.prof" % name)
+    profiler = cProfile.Profile()
+    profiler.runcall(call)
+    profiler.dump_stats(path)
+    print("-- %s -> %s" % (name, path))
+    pstats.Stats(path).sort_stats("cumulative").print_stats(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-k", "--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--min-time", type=float, default=1.0, help="每个用例的最短计时(秒)")
+    parser.add_argument("--json", help="保存结果到该文件")
+    parser.add_argument("--compare", help="与之前保存的结果对比")
+    parser.add_argument("--profile", metavar="DIR", help="输出 cProfile 结果")
+    parser.add_argument("--top", type=int, default=15, help="剖析时打印的函数数")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    print("yz_utils.db.encoders: %s" % encoders.__file__)
+    results = {}
+    print("%-24s %12s %10s %12s %10s %9s" % (
+        "case", "ops/s", "blocks", "alloc KiB", "peak KiB", "vs base"))
+    for name, build in build_cases().items():
+        if args.filter not in name:
+            continue
+        call = build()
+        if call is None:
+            print("%-24s %12s" % (name, "skipped"))
+            continue
+        stats = measure(call, args.min_time)
+        results[name] = stats
+        delta = ""
+        if name in baseline:
+            delta = "%+.1f%%" % (
+                (stats["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1) * 100)
+        print("%-24s %12.1f %10d %12.1f %10.1f %9s" % (
+            name, stats["ops_per_sec"], stats["alloc_blocks"],
+            stats["alloc_kib"], stats["peak_kib"], delta))
+        if args.profile:
+            profile(name, call, args.profile, args.top)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "created_at": datetime.datetime.now().isoformat(),
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
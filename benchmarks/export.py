@@ -0,0 +1,64 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: export_jsonl 端到端: 本地 SQLite 文件，单进程 vs 多进程，并校验导出的行
+
+python benchmarks/export.py --rows 500000 --workers 1 4
+"""
+import argparse
+import gzip
+import json
+import os
+import tempfile
+
+from _common import BenchItem, make_item_data, make_session, report
+from yz_utils.db.export import export_jsonl
+from yz_utils.db.orm_crud_base import CRUDBase
+
+
+def read_ids(files, compress):
+    opener = gzip.open if compress else open
+    ids = []
+    for path in files:
+        with opener(path, "rt", encoding="utf-8") as f:
+            ids.extend(json.loads(line)["id"] for line in f)
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--compress", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = "sqlite:///%s" % os.path.join(tmp, "export.db")
+        db = make_session(url)
+        crud = CRUDBase(BenchItem)
+        for start in range(0, args.rows, 100000):
+            crud.create_many(db, data=[
+                make_item_data(i)
+                for i in range(start, min(start + 100000, args.rows))
+            ])
+        db.close()
+
+        for workers in args.workers:
+            out_dir = os.path.join(tmp, "out-%d" % workers)
+            result = export_jsonl(
+                url, BenchItem, out_dir, workers=workers,
+                compress=args.compress,
+                progress=lambda p: print(
+                    "\r  %(shards_done)d/%(shards_total)d shards, "
+                    "%(rows)d rows, %(rows_per_sec).0f rows/s" % p, end=""))
+            print()
+            ids = read_ids(result["files"], args.compress)
+            assert sorted(ids) == list(range(1, args.rows + 1))
+            report("workers=%d (%d files)" % (workers, len(result["files"])),
+                   result["seconds"], result["rows"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: 各子包的冷启动导入耗时(python -X importtime)及导入副作用检查
+
+每个模块在新的解释器、空的临时工作目录中导入 --runs 次，取累计耗时的中位数；
+同时检查:
+    * 导入时不应加载的重量级依赖(FORBIDDEN)
+    * 导入时不打印、不在工作目录下创建文件、不修改 sys.path
+
+结果可保存为 json，之后与之对比，超过基线 (1 + tolerance) 倍且多于 --slack 毫秒视为回退:
+    python benchmarks/import_time.py --json before.json
+    python benchmarks/import_time.py --compare before.json
+有检查失败或回退时退出码为 1
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 模块 -> 导入它时不应被加载的依赖
+FORBIDDEN = {
+    "yz_utils": ("pydantic", "sqlalchemy"),
+    "yz_utils.db": ("pydantic", "sqlalchemy"),
+    "yz_utils.db.encoders": ("pydantic", "sqlalchemy", "numpy"),
+    "yz_utils.db.cache": ("pydantic", "sqlalchemy", "pickle"),
+    "yz_utils.db.instrumentation": ("pydantic",),
+    "yz_utils.db.orm_crud_base": ("pydantic",),
+    "yz_utils.db.async_crud_base": ("pydantic",),
+    "yz_utils.db.export": ("pydantic",),
+    "yz_utils.logger": ("pydantic", "sqlalchemy", "logging.config"),
+}
+
+PROBE = """
+import sys
+before = list(sys.path)
+import %(module)s
+print("\\0" + repr({
+    "loaded": [m for m in %(forbidden)r if m in sys.modules],
+    "sys_path_changed": sys.path != before,
+}))
+"""
+
+
+def measure(module: str, forbidden: tuple) -> dict:
+    """在新进程中导入一次 module，返回累计耗时(毫秒)和副作用"""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c",
+             PROBE % {"module": module, "forbidden": forbidden}],
+            cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, check=True)
+        created = sorted(os.listdir(cwd))
+
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1]) / 1000
+    output, _, probe = proc.stdout.rpartition("\0")
+    result = ast.literal_eval(probe)
+    result.update(ms=cumulative, output=output.strip(), created=created)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-k", "--filter", default="",
+                        help="只检查名称包含该字符串的模块")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="保存结果到该文件")
+    parser.add_argument("--compare", help="与之前保存的结果对比")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--slack", type=float, default=5.0,
+                        help="允许的绝对增量(毫秒)，避免小模块的抖动被判为回退")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failures = []
+    print("%-30s %10s %10s  %s" % ("module", "median ms", "vs base", "checks"))
+    for module, forbidden in FORBIDDEN.items():
+        if args.filter not in module:
+            continue
+        runs = [measure(module, forbidden) for _ in range(args.runs)]
+        ms = statistics.median(run["ms"] for run in runs)
+        results[module] = ms
+        last = runs[-1]
+
+        problems = []
+        if last["loaded"]:
+            problems.append("imports " + ", ".join(last["loaded"]))
+        if last["output"]:
+            problems.append("prints %r" % last["output"][:40])
+        if last["created"]:
+            problems.append("creates " + ", ".join(last["created"]))
+        if last["sys_path_changed"]:
+            problems.append("changes sys.path")
+
+        change = ""
+        if module in baseline:
+            base = baseline[module]
+            change = "%+.1f%%" % ((ms - base) / base * 100)
+            if ms > base * (1 + args.tolerance) and ms - base > args.slack:
+                problems.append("regressed from %.1fms" % base)
+        print("%-30s %10.1f %10s  %s" % (
+            module, ms, change, "; ".join(problems) or "ok"))
+        failures.extend("%s: %s" % (module, p) for p in problems)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
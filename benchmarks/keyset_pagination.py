@@ -0,0 +1,55 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: CRUDBase.list(offset) 与 list_by_cursor(keyset) 在不同页深度的单页耗时
+
+python benchmarks/keyset_pagination.py --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+
+from _common import BenchItem, make_item_data, make_session, report, timed
+from yz_utils.db.orm_crud_base import CRUDBase
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    crud = CRUDBase(BenchItem)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_session("sqlite:///%s" % os.path.join(tmp, "keyset.db"))
+        for start in range(0, args.rows, 100000):
+            crud.create_many(db, data=[
+                make_item_data(i)
+                for i in range(start, min(start + 100000, args.rows))
+            ])
+        sort = ["created_at desc"]
+        print("== %d rows, page size %d, sort %s" % (args.rows, args.limit, sort))
+        for depth in (0, args.rows // 10, args.rows // 2, args.rows - args.limit * 2):
+            offset_seconds, _ = timed(lambda: crud.list(
+                db, sort=sort + ["id desc"], offset=depth, limit=args.limit),
+                args.repeat)
+            report("offset=%d" % depth, offset_seconds)
+
+            cursor = None
+            if depth:
+                last = crud.list(db, sort=sort + ["id desc"],
+                                 offset=depth - 1, limit=1)[0]
+                cursor = crud.cursor_for(last, sort)
+            keyset_seconds, (rows, _) = timed(lambda: crud.list_by_cursor(
+                db, sort=sort, cursor=cursor, limit=args.limit), args.repeat)
+            assert len(rows) == args.limit
+            report("keyset at %d (x%.1f)" % (depth, offset_seconds / keyset_seconds),
+                   keyset_seconds)
+            db.expunge_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: NumPy 数组编码: 逐元素自定义编码 vs tolist() vs base64
+
+python benchmarks/numpy_encoder.py --size 1000000
+"""
+import argparse
+
+import numpy
+
+from _common import report, timed
+from yz_utils.db.encoders import jsonable_encoder
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    per_element = {numpy.generic: lambda v: v.item()}
+    for dtype in ("float64", "int64"):
+        arr = numpy.arange(args.size, dtype=dtype)
+        print("== %d x %s" % (args.size, dtype))
+        base, _ = timed(
+            lambda: jsonable_encoder(list(arr), custom_encoder=per_element),
+            args.repeat,
+        )
+        report("per-element custom_encoder", base, args.size)
+        for mode in ("list", "base64", "bytes"):
+            seconds, _ = timed(
+                lambda: jsonable_encoder(arr, array_mode=mode), args.repeat)
+            report("array_mode=%s (x%.0f)" % (mode, base / seconds),
+                   seconds, args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: 宽表上 CRUDBase.list 全量 ORM 对象 vs columns= 投影查询的耗时和内存
+
+python benchmarks/projection.py --rows 50000 --width 40
+"""
+import argparse
+import tracemalloc
+
+from sqlalchemy import Column, Integer, String
+
+from _common import make_session, report, timed
+from yz_utils.db.orm_crud_base import Base, CRUDBase
+
+
+def make_wide_model(width: int):
+    attrs = {"id": Column(Integer, primary_key=True)}
+    for i in range(width):
+        attrs["c%d" % i] = Column(String(32))
+    return type("BenchWide", (Base,), attrs)
+
+
+def peak_kib(fn) -> float:
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--width", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model = make_wide_model(args.width)
+    db = make_session()
+    crud = CRUDBase(model)
+    crud.create_many(db, data=[
+        dict(("c%d" % c, "value-%d-%d" % (i, c)) for c in range(args.width))
+        for i in range(args.rows)
+    ])
+
+    cases = {
+        "orm objects": lambda: crud.list(db, limit=args.rows),
+        "columns=[id, c0]": lambda: crud.list(
+            db, limit=args.rows, columns=["id", "c0"]),
+        "columns=[id, c0], as_dict": lambda: crud.list(
+            db, limit=args.rows, columns=["id", "c0"], as_dict=True),
+    }
+    print("== %d rows x %d columns" % (args.rows, args.width + 1))
+    for name, fn in cases.items():
+        def run():
+            try:
+                return fn()
+            finally:
+                db.expunge_all()
+        seconds, _ = timed(run, args.repeat)
+        report("%s (peak %.0f KiB)" % (name, peak_kib(run)), seconds, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: CRUDBase.get/count/list 使用 StatementCache 前后的每秒调用次数
+
+python benchmarks/statement_cache.py --calls 20000
+"""
+import argparse
+
+from _common import BenchItem, Color, make_item_data, make_session, report, timed
+from yz_utils.db.cache import StatementCache
+from yz_utils.db.orm_crud_base import CRUDBase
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    db = make_session()
+    CRUDBase(BenchItem).create_many(
+        db, data=[make_item_data(i) for i in range(args.rows)])
+    db.expunge_all()
+
+    statement_cache = StatementCache()
+    cruds = {
+        "no cache": CRUDBase(BenchItem),
+        "statement_cache": CRUDBase(BenchItem, statement_cache=statement_cache),
+    }
+    for name, crud in cruds.items():
+        print("== %s" % name)
+        cases = {
+            # expunge 后 get 每次都要发出 SELECT，而不是命中 identity map
+            "get": lambda i: (crud.get(db, i % args.rows + 1), db.expunge_all()),
+            "get columns=[name]": lambda i: crud.get(
+                db, i % args.rows + 1, columns=["name"]),
+            "count(color=...)": lambda i: crud.count(db, color=Color.red),
+            "list(opt, sort, limit=10)": lambda i: crud.list(
+                db, opt={"color": Color.red}, sort=["id desc"],
+                offset=i % 50, limit=10),
+        }
+        for case, fn in cases.items():
+            def run():
+                for i in range(args.calls):
+                    fn(i)
+                db.expunge_all()
+            seconds, _ = timed(run, args.repeat)
+            report(case, seconds, args.calls)
+    print(statement_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
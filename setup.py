@@ -66,6 +66,6 @@ setup(
         # "flask-mail==0.9.1",
     ],
     # extras_require=extras_require,
-    python_requires=">=3.6.8"
+    python_requires=">=3.7"
 )
 
@@ -0,0 +1,439 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: 基于 SQLAlchemy AsyncSession 的 CRUDBase
+
+方法与 CRUDBase 同名同参，均为协程:
+
+    engine = create_async_engine("sqlite+aiosqlite:///data.db")
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    crud = AsyncCRUDBase(Item)
+
+    async with Session() as db:
+        obj = await crud.get(db, 1)
+
+一个 AsyncSession 同一时间只能执行一条语句，并发读取(asyncio.gather)时每个任务
+使用自己的 AsyncSession:
+
+    async def get(id):
+        async with Session() as db:
+            return await crud.get(db, id)
+
+    objs = await asyncio.gather(*[get(id) for id in ids])
+
+AsyncSession 不支持属性的隐式懒加载，建议 expire_on_commit=False，
+关系属性使用 selectin 等预加载
+"""
+from typing import Any, Dict, Generic, List, Optional, Sequence, Type, Union
+
+from sqlalchemy import delete, func, inspect, select, text, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import StatementCache
+from .encoders import is_pydantic_model, jsonable_encoder
+from .instrumentation import crud_operation
+from .orm_crud_base import (
+    DEFAULT_IN_CHUNK_SIZE, IN_CHUNK_SIZES, CreateSchemaType, CRUDBase, ModelType,
+    UpdateSchemaType, _filter_params, _filter_shape, iter_batches,
+    supports_returning
+)
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init__(
+            self, model: Type[ModelType],
+            statement_cache: StatementCache = None
+    ):
+        """
+        CRUD object with default async methods to Create, Read, Update, Delete.
+        **Parameters**
+        * `model`: A SQLAlchemy model class
+        * `statement_cache`: Reuse prebuilt statements in `get`, `count` and
+          `list`, see `yz_utils.db.cache.StatementCache`
+        """
+        self.model = model
+        self.statement_cache = statement_cache
+        # 语句构建、行转换等与会话无关的逻辑复用同步版本
+        self._sync = CRUDBase(model, statement_cache=statement_cache)
+
+    def _from_identity_map(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        return self._sync._from_identity_map(db.sync_session, id)
+
+    def _id_chunk_size(self, db: AsyncSession, per_id: int = 1) -> int:
+        dialect_name = db.sync_session.get_bind(self.model).dialect.name
+        return IN_CHUNK_SIZES.get(dialect_name, DEFAULT_IN_CHUNK_SIZE) // per_id
+
+    @crud_operation
+    async def count(self, db: AsyncSession, **kwargs) -> int:
+        """
+        获取总数
+
+        :param db:
+        :param kwargs: filter_by 条件
+        :return:
+        """
+        if self.statement_cache is not None:
+            shape = _filter_shape(kwargs)
+            stmt = self._sync._statement(
+                ("count", shape), self._sync._build_count, shape)
+            return (await db.execute(stmt, _filter_params(kwargs))).scalar()
+        pk = self.model.__mapper__.primary_key[0]
+        # select_from 后 filter_by 在 SQLAlchemy 2.0 中会因实体和表同名列而报歧义
+        stmt = select(func.count(pk)).select_from(self.model).where(*[
+            getattr(self.model, key) == value for key, value in kwargs.items()
+        ])
+        return (await db.execute(stmt)).scalar()
+
+    @crud_operation
+    async def get(
+            self, db: AsyncSession, id: Any, *,
+            columns: Sequence[str] = None,
+            as_dict: bool = False
+    ) -> Optional[Union[ModelType, Any]]:
+        """
+        主键查询，Session 中已有的未过期对象直接返回，不发出 SQL
+
+        :param db:
+        :param id:
+        :param columns: 只查询这些列，返回 Row(命名元组)
+        :param as_dict: 与 columns 一起使用，返回 {列名: 值}
+        :return:
+        """
+        if not columns:
+            return await db.get(self.model, id)
+        if self.statement_cache is not None:
+            columns = tuple(columns)
+            stmt = self._sync._statement(
+                ("get", columns), self._sync._build_get, columns)
+        else:
+            stmt = self._sync._build_get(tuple(columns))
+        row = (await db.execute(stmt, self._sync._pk_params(id))).first()
+        return row._asdict() if as_dict and row is not None else row
+
+    @crud_operation
+    async def get_many(
+            self, db: AsyncSession, ids: Sequence[Any], *,
+            chunk_size: int = None
+    ) -> List[Optional[ModelType]]:
+        """
+        批量主键查询，先取 identity map，其余 id 用分块的 IN (...) 查询
+
+        :param db:
+        :param ids:
+        :param chunk_size: 每条 IN 查询的 id 数，默认按方言的参数上限选择
+        :return: 与 ids 顺序一致的列表，不存在的 id 对应 None
+        """
+        found: Dict[Any, Optional[ModelType]] = {}
+        pending = []
+        for id in dict.fromkeys(ids):
+            obj = self._from_identity_map(db, id)
+            if obj is not None and not inspect(obj).expired:
+                found[id] = obj
+            else:
+                pending.append(id)
+        if pending:
+            mapper = self.model.__mapper__
+            pk_columns = [
+                getattr(self.model, mapper.get_property_by_column(c).key)
+                for c in mapper.primary_key
+            ]
+            if chunk_size is None:
+                chunk_size = self._id_chunk_size(db, len(pk_columns))
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                if len(pk_columns) == 1:
+                    criterion = pk_columns[0].in_(chunk)
+                else:
+                    criterion = tuple_(*pk_columns).in_(chunk)
+                result = await db.execute(select(self.model).where(criterion))
+                for obj in result.scalars():
+                    found[self._sync._identity(obj)] = obj
+        return [found.get(id) for id in ids]
+
+    @crud_operation
+    async def list(
+            self, db: AsyncSession, *,
+            opt: dict = None,
+            sort: List[str] = None,
+            offset: int = 0,
+            limit: int = 100,
+            columns: Sequence[str] = None,
+            as_dict: bool = False
+    ) -> List[Union[ModelType, Any]]:
+        """
+        列表查询
+
+        :param db:
+        :param opt:
+        :param sort:
+        :param offset:
+        :param limit:
+        :param columns: 只查询这些列，返回 Row(命名元组)
+        :param as_dict: 与 columns 一起使用，返回 dict 列表
+        :return:
+        """
+        columns = tuple(columns) if columns else None
+        if self.statement_cache is not None:
+            opt = opt or {}
+            shape = _filter_shape(opt)
+            sort = tuple(sort or ())
+            stmt = self._sync._statement(
+                ("list", shape, sort, columns),
+                self._sync._build_list, shape, sort, columns)
+            params = _filter_params(opt)
+            params["yz_offset"] = offset
+            params["yz_limit"] = limit
+            result = await db.execute(stmt, params)
+        else:
+            if columns:
+                stmt = select(*self._sync._projection(columns))
+            else:
+                stmt = select(self.model)
+            if opt:
+                stmt = stmt.filter_by(**opt)
+            if sort:
+                stmt = stmt.order_by(*[text(s) for s in sort])
+            result = await db.execute(stmt.offset(offset).limit(limit))
+        if not columns:
+            return result.scalars().all()
+        rows = result.all()
+        return [row._asdict() for row in rows] if as_dict else rows
+
+    @crud_operation
+    async def create(
+            self, db: AsyncSession, *,
+            data: Union[Dict[str, Any], CreateSchemaType]
+    ) -> ModelType:
+        """
+        插入操作
+
+        :param db:
+        :param data:
+        :return:
+        """
+        if is_pydantic_model(data):
+            data = jsonable_encoder(data)
+        db_obj = self.model(**data)  # type: ignore
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    @crud_operation
+    async def create_many(
+            self, db: AsyncSession, *,
+            data: Sequence[Union[Dict[str, Any], CreateSchemaType]],
+            chunk_size: int = 1000,
+            return_pks: bool = False
+    ) -> Union[int, List[Any]]:
+        """
+        批量插入: 分块 executemany，整个批次只提交一次
+
+        :param db:
+        :param data: 以属性名为键的 dict 或 Pydantic schema 列表
+        :param chunk_size: 每条 INSERT 语句的最大行数
+        :param return_pks: 返回主键列表，顺序见 CRUDBase.create_many
+        :return: 插入行数，或 return_pks=True 时的主键列表
+        """
+        rows = self._sync._to_rows(data)
+        table = self.model.__table__
+        returning = return_pks and supports_returning(
+            db.sync_session, "insert", self.model)
+        dialect = db.sync_session.get_bind(self.model).dialect
+        pks: List[Any] = []
+        for batch in iter_batches(rows, chunk_size):
+            if not return_pks:
+                await db.execute(table.insert(), batch)
+            elif returning:
+                for stmt, params in self._sync._insert_returning(dialect, batch):
+                    pks.extend(
+                        self._sync._returned_pks(await db.execute(stmt, params)))
+            else:
+                pks.extend(await db.run_sync(
+                    self._sync._bulk_insert_pks, batch))
+        await db.commit()
+        return pks if return_pks else len(rows)
+
+    @crud_operation
+    async def upsert_many(
+            self, db: AsyncSession, *,
+            data: Sequence[Union[Dict[str, Any], CreateSchemaType]],
+            index_elements: List[str] = None,
+            update_fields: List[str] = None,
+            chunk_size: int = 1000
+    ) -> int:
+        """
+        批量插入或更新，语义同 CRUDBase.upsert_many
+
+        :param db:
+        :param data: 以属性名为键的 dict 或 Pydantic schema 列表
+        :param index_elements: 冲突判断的唯一列，默认为主键
+        :param update_fields: 冲突时更新的列，默认为数据中除冲突列外的所有列
+        :param chunk_size:
+        :return: 处理的行数
+        """
+        rows = self._sync._to_rows(data)
+        if not rows:
+            return 0
+        dialect_name = db.sync_session.get_bind(self.model).dialect.name
+        for stmt, batch in self._sync._upsert_batches(
+                dialect_name, rows, index_elements, update_fields, chunk_size):
+            await db.execute(stmt, batch)
+        await db.commit()
+        return len(rows)
+
+    @crud_operation
+    async def update(
+            self, db: AsyncSession, *,
+            id: int = None,
+            obj: ModelType = None,
+            data: Union[UpdateSchemaType, Dict[str, Any]],
+            is_return_obj: bool = False
+    ) -> ModelType:
+        """
+        更新操作，语义同 CRUDBase.update
+
+        :param db:
+        :param id:
+        :param obj:
+        :param data:
+        :param is_return_obj:
+        :return: 更新行数，或 is_return_obj=True 时更新后的对象(不存在时为 None)
+        """
+        if not any((id, obj)):
+            raise ValueError('At least one of id or obj exists')
+        update_data = self._sync._update_values(data)
+        if not update_data and not obj:
+            # 没有可更新的列，不发出 SET 为空的 UPDATE
+            return await self.get(db, id) if is_return_obj else 0
+
+        if not is_return_obj and id:
+            result = await db.execute(
+                update(self.model)
+                .where(self.model.id == id)
+                .values(**update_data)
+            )
+            await db.commit()
+            return result.rowcount
+        elif not obj and supports_returning(db.sync_session, "update", self.model):
+            stmt = (
+                update(self.model)
+                .where(self.model.id == id)
+                .values(**update_data)
+                .returning(*self.model.__table__.columns)
+                .execution_options(synchronize_session=False)
+            )
+            row = (await db.execute(stmt)).first()
+            await db.commit()
+            if row is None:
+                return None
+            return self._sync._from_row(
+                db.sync_session, self._sync._returned_row(row))
+        else:
+            if not obj:
+                obj = await db.get(self.model, id)
+                if obj is None:
+                    return None
+            for field, value in update_data.items():
+                setattr(obj, field, value)
+            db.add(obj)
+            await db.commit()
+            await db.refresh(obj)
+            return obj
+
+    @crud_operation
+    async def update_many(
+            self, db: AsyncSession, *,
+            ids: Sequence[Any],
+            data: Union[UpdateSchemaType, Dict[str, Any]],
+            is_return_obj: bool = False
+    ) -> Union[int, List[ModelType]]:
+        """
+        用 UPDATE ... WHERE id IN (...) 批量更新，语义同 CRUDBase.update_many
+
+        :param db:
+        :param ids:
+        :param data: 所有行更新为相同的值
+        :param is_return_obj:
+        :return: 更新行数，或 is_return_obj=True 时更新后的对象列表(不含不存在的 id)
+        """
+        update_data = self._sync._update_values(data)
+        ids = list(dict.fromkeys(ids))
+        if not update_data:
+            if not is_return_obj:
+                return 0
+            return [obj for obj in await self.get_many(db, ids) if obj is not None]
+        returning = is_return_obj and supports_returning(
+            db.sync_session, "update", self.model)
+        count = 0
+        rows = []
+        chunk_size = self._id_chunk_size(db)
+        for start in range(0, len(ids), chunk_size):
+            stmt = (
+                update(self.model)
+                .where(self.model.id.in_(ids[start:start + chunk_size]))
+                .values(**update_data)
+                .execution_options(synchronize_session=False)
+            )
+            if returning:
+                stmt = stmt.returning(*self.model.__table__.columns)
+                result = (await db.execute(stmt)).all()
+                count += len(result)
+                rows.extend(self._sync._returned_row(row) for row in result)
+            else:
+                count += (await db.execute(stmt)).rowcount
+        if not returning:
+            for id in ids:
+                obj = self._from_identity_map(db, id)
+                if obj is not None:
+                    db.expire(obj)
+        await db.commit()
+        if not is_return_obj:
+            return count
+        if returning:
+            return [self._sync._from_row(db.sync_session, row) for row in rows]
+        return [obj for obj in await self.get_many(db, ids) if obj is not None]
+
+    @crud_operation
+    async def delete(
+            self, db: AsyncSession, *,
+            id: int, is_return_obj: bool = False
+    ) -> ModelType:
+        """
+        删除操作，语义同 CRUDBase.delete
+
+        :param db:
+        :param id:
+        :param is_return_obj:
+        :return: 删除行数，或 is_return_obj=True 时被删除的对象(不存在时为 None)
+        """
+        if is_return_obj and supports_returning(
+                db.sync_session, "delete", self.model):
+            stmt = (
+                delete(self.model)
+                .where(self.model.id == id)
+                .returning(*self.model.__table__.columns)
+                .execution_options(synchronize_session=False)
+            )
+            row = (await db.execute(stmt)).first()
+            current = self._from_identity_map(db, id)
+            if current is not None:
+                db.expunge(current)
+            await db.commit()
+            if row is None:
+                return None
+            return self.model(**self._sync._returned_row(row))
+        elif is_return_obj:
+            obj = await db.get(self.model, id)
+            if obj is None:
+                return None
+            await db.delete(obj)
+            await db.commit()
+            return obj
+        else:
+            result = await db.execute(
+                delete(self.model).where(self.model.id == id))
+            await db.commit()
+            return result.rowcount
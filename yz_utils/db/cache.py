@@ -0,0 +1,376 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: CRUDBase 的读穿透缓存
+
+后端:
+    * LRUCache: 进程内 LRU + TTL
+    * SharedCache: 共享缓存(Redis 等)适配器，客户端需兼容 redis-py 的 get/set/delete
+    * FakeSharedClient: SharedCache 的本地替身，用于测试
+
+ReadThroughCache 在后端之上提供单飞加载(并发未命中只加载一次)、失效和命中统计
+
+StatementCache 缓存按"形状"(模型、过滤字段、排序等)构建好的 SQL 语句对象
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class _CacheMiss:
+    def __repr__(self):
+        return "CACHE_MISS"
+
+
+CACHE_MISS = _CacheMiss()
+
+
+class CacheBackend:
+    """
+    缓存后端接口，未命中时 get 返回 CACHE_MISS(None 是合法的缓存值)
+    """
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        批量读取，只返回命中的键
+
+        :param keys:
+        :return:
+        """
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not CACHE_MISS:
+                result[key] = value
+        return result
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """
+    进程内 LRU 缓存，超过 maxsize 淘汰最久未使用的键，ttl(秒)到期后视为未命中
+
+    不经过 CRUDBase 的写入(其他进程、原生 SQL)不会触发失效，默认 ttl 为 300 秒，
+    传 None 表示永不过期；值按引用保存，调用方需自行保证不被修改
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return CACHE_MISS
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return CACHE_MISS
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedCache(CacheBackend):
+    """
+    共享缓存适配器，值经 dumps 序列化后写入 client
+
+    :param client: 兼容 redis-py 的客户端，需提供 get/set(ex=)/delete，可选 mget
+    :param prefix: 键前缀
+    :param ttl: 默认过期时间(秒)
+    :param dumps/loads: 序列化函数，默认 pickle，仅用于受信任的内部缓存
+    """
+
+    def __init__(
+            self, client: Any, prefix: str = "yz:", ttl: Optional[float] = 300,
+            dumps: Callable[[Any], bytes] = None,
+            loads: Callable[[bytes], Any] = None
+    ):
+        if dumps is None or loads is None:
+            import pickle
+            dumps = dumps or pickle.dumps
+            loads = loads or pickle.loads
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+
+    def get(self, key: str) -> Any:
+        data = self.client.get(self.prefix + key)
+        return CACHE_MISS if data is None else self.loads(data)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, self.dumps(value),
+                        ex=int(ttl) if ttl else None)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        if not keys or not hasattr(self.client, "mget"):
+            return super().get_many(keys)
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {
+            key: self.loads(data)
+            for key, data in zip(keys, values) if data is not None
+        }
+
+    def clear(self):
+        raise NotImplementedError("SharedCache does not support clear")
+
+
+class FakeSharedClient:
+    """
+    redis-py 客户端的本地替身: 只保存 bytes，支持 get/set(ex=)/delete/mget
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(name)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name: str, value: bytes, ex: Optional[int] = None):
+        if not isinstance(value, bytes):
+            raise TypeError("FakeSharedClient only stores bytes")
+        expires_at = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._data[name] = (value, expires_at)
+        return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def mget(self, names: List[str]) -> List[Optional[bytes]]:
+        return [self.get(name) for name in names]
+
+
+class ReadThroughCache:
+    """
+    读穿透缓存
+
+    * get_or_load: 未命中时调用 loader 并回填；同一个键的并发未命中只有一个线程执行
+      loader，其余线程等待后直接读缓存(防击穿)
+    * invalidate: 删除键；加载过程中发生的失效会使这次加载结果不回填，避免写回旧值
+    * stats: hits/misses/loads/invalidations 计数
+
+    :param backend: 缓存后端
+    :param namespace: 键前缀，通常为表名
+    :param cache_none: 是否缓存"不存在"的结果
+    """
+
+    def __init__(self, backend: CacheBackend, namespace: str,
+                 cache_none: bool = False):
+        self.backend = backend
+        self.namespace = namespace
+        self.cache_none = cache_none
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.invalidations = 0
+        self._generation = 0
+        self._mutex = threading.Lock()
+        self._key_locks: Dict[str, list] = {}
+
+    def key(self, id: Hashable) -> str:
+        if isinstance(id, (tuple, list)):
+            id = ":".join(str(i) for i in id)
+        return "%s:%s" % (self.namespace, id)
+
+    def _count(self, name: str, n: int = 1):
+        with self._mutex:
+            setattr(self, name, getattr(self, name) + n)
+
+    def get(self, id: Hashable) -> Any:
+        value = self.backend.get(self.key(id))
+        self._count("hits" if value is not CACHE_MISS else "misses")
+        return value
+
+    def get_many(self, ids: List[Hashable]) -> Dict[Hashable, Any]:
+        """
+        批量读取，返回命中的 {id: value}
+
+        :param ids:
+        :return:
+        """
+        keys = {self.key(id): id for id in ids}
+        found = self.backend.get_many(keys)
+        self._count("hits", len(found))
+        self._count("misses", len(keys) - len(found))
+        return {keys[key]: value for key, value in found.items()}
+
+    @property
+    def generation(self) -> int:
+        """每次失效递增，加载前记录、回填时传给 set 以丢弃过期的加载结果"""
+        return self._generation
+
+    def set(self, id: Hashable, value: Any, generation: int = None):
+        if generation is not None and generation != self._generation:
+            return
+        if value is not None or self.cache_none:
+            self.backend.set(self.key(id), value)
+
+    def get_or_load(self, id: Hashable, loader: Callable[[], Any]) -> Any:
+        key = self.key(id)
+        value = self.backend.get(key)
+        if value is not CACHE_MISS:
+            self._count("hits")
+            return value
+
+        with self._mutex:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                value = self.backend.get(key)
+                if value is not CACHE_MISS:
+                    self._count("hits")
+                    return value
+                with self._mutex:
+                    self.misses += 1
+                    self.loads += 1
+                    generation = self._generation
+                value = loader()
+                self.set(id, value, generation)
+                return value
+        finally:
+            with self._mutex:
+                entry[1] -= 1
+                if not entry[1]:
+                    self._key_locks.pop(key, None)
+
+    def invalidate(self, *ids: Hashable):
+        with self._mutex:
+            self._generation += 1
+            self.invalidations += len(ids)
+        for id in ids:
+            self.backend.delete(self.key(id))
+
+    def clear(self):
+        """清空后端(需后端支持 clear)，用于无法按键失效的缓存，如计数结果"""
+        with self._mutex:
+            self._generation += 1
+            self.invalidations += 1
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class StatementCache:
+    """
+    预构建语句的 LRU 缓存
+
+    相同形状的查询复用同一个 select() 对象，变化的值用 bindparam 在执行时传入，
+    省去每次构建 Query 和计算语句缓存键的 Python 开销；编译结果由 SQLAlchemy
+    引擎的 compiled_cache 缓存。可由多个 CRUDBase 共享
+
+    :param maxsize: 最多保留的语句数，超过时淘汰最久未使用的
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Hashable, builder: Callable[[], Any]) -> Any:
+        """
+        取出 key 对应的语句，未命中时调用 builder 构建并保存
+
+        builder 只依赖 key 中的信息，并发未命中时可能构建多次，结果等价
+
+        :param key:
+        :param builder:
+        :return:
+        """
+        with self._lock:
+            statement = self._data.get(key)
+            if statement is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return statement
+            self.misses += 1
+        statement = builder()
+        with self._lock:
+            self._data[key] = statement
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return statement
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
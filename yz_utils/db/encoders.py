@@ -4,16 +4,26 @@
 @auth: cml
 @date: 2020-5-2
 @desc: ...
+
+pydantic 和 sqlalchemy 在用到时才导入: 进程中没有导入过它们时，
+也不可能存在 BaseModel 实例或 ORM 对象，不必为判断类型而导入
 """
+import base64
+import datetime
+import sys
+from decimal import Decimal
 from enum import Enum
+from functools import partial
+from operator import attrgetter
 from pathlib import PurePath
 from types import GeneratorType
-from typing import Any, Callable, Dict, List, Set, Tuple, Union
+from uuid import UUID
+from typing import (
+    Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+)
 
 # from fastapi.logger import logger
 # from fastapi.utils import PYDANTIC_1
-from pydantic import BaseModel
-from pydantic.json import ENCODERS_BY_TYPE
 
 SetIntStr = Set[Union[int, str]]
 DictIntStrAny = Dict[Union[int, str], Any]
@@ -31,7 +41,221 @@ def generate_encoders_by_class_tuples(
     return encoders_by_class_tuples
 
 
-encoders_by_class_tuples = generate_encoders_by_class_tuples(ENCODERS_BY_TYPE)
+_Encoders = Tuple[Dict[Any, Callable], Dict[Callable, Tuple]]
+_pydantic_encoders: Optional[_Encoders] = None
+
+
+def _get_pydantic_encoders() -> _Encoders:
+    """
+    pydantic 的 ENCODERS_BY_TYPE 及按编码函数分组的类元组，首次使用时导入并计算
+
+    :return: (ENCODERS_BY_TYPE, encoders_by_class_tuples)
+    """
+    global _pydantic_encoders
+    if _pydantic_encoders is None:
+        from pydantic.json import ENCODERS_BY_TYPE
+        _pydantic_encoders = (
+            ENCODERS_BY_TYPE, generate_encoders_by_class_tuples(ENCODERS_BY_TYPE))
+    return _pydantic_encoders
+
+
+def __getattr__(name: str) -> Any:
+    # 兼容原先的模块级变量
+    if name == "ENCODERS_BY_TYPE":
+        return _get_pydantic_encoders()[0]
+    if name == "encoders_by_class_tuples":
+        return _get_pydantic_encoders()[1]
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def _loaded_attr(module: str, name: str) -> Any:
+    """已导入模块的属性，模块未导入时返回 None 而不是导入它"""
+    loaded = sys.modules.get(module)
+    return getattr(loaded, name, None) if loaded is not None else None
+
+
+_pydantic_base_model: Optional[type] = None
+_sa_inspect: Optional[Callable] = None
+
+
+def _find_pydantic_base_model() -> Optional[type]:
+    global _pydantic_base_model
+    _pydantic_base_model = _loaded_attr("pydantic", "BaseModel")
+    return _pydantic_base_model
+
+
+def _find_sa_inspect() -> Optional[Callable]:
+    global _sa_inspect
+    _sa_inspect = _loaded_attr("sqlalchemy", "inspect")
+    return _sa_inspect
+
+
+def is_pydantic_model(obj: Any) -> bool:
+    """
+    obj 是否为 pydantic BaseModel 实例，pydantic 未被导入时直接返回 False
+
+    :param obj:
+    :return:
+    """
+    base_model = _pydantic_base_model or _find_pydantic_base_model()
+    return base_model is not None and isinstance(obj, base_model)
+
+
+# 每个类只做一次 mapper 检查: {cls: (列属性名, 关系属性名)}，非 ORM 类为 None
+_orm_attrs_cache: Dict[type, Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]] = {}
+
+
+def get_orm_attrs(cls: type) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    """
+    获取 ORM 模型类的列属性名和关系属性名，结果按类缓存
+
+    :param cls: 任意类
+    :return: (columns, relationships)，非 SQLAlchemy 映射类返回 None
+    """
+    try:
+        return _orm_attrs_cache[cls]
+    except KeyError:
+        pass
+    attrs = None
+    sa_inspect = _sa_inspect or _find_sa_inspect()
+    if sa_inspect is not None:
+        mapper = sa_inspect(cls, raiseerr=False)
+        if mapper is not None and hasattr(mapper, "column_attrs"):
+            attrs = (
+                tuple(prop.key for prop in mapper.column_attrs),
+                tuple(prop.key for prop in mapper.relationships),
+            )
+    _orm_attrs_cache[cls] = attrs
+    return attrs
+
+
+def get_orm_columns(cls: type) -> Tuple[str, ...]:
+    """
+    获取 ORM 模型类的列属性名，非映射类返回空元组
+
+    :param cls:
+    :return:
+    """
+    attrs = get_orm_attrs(cls)
+    return attrs[0] if attrs else ()
+
+
+def orm_loaded_data(
+    obj: Any,
+    attrs: Tuple[Tuple[str, ...], Tuple[str, ...]],
+    orm_relationships: bool = False,
+) -> Dict[str, Any]:
+    """
+    只读取已加载到实例中的属性，不会触发懒加载 SQL
+
+    延迟加载、已过期的列不在 state.dict 中，直接跳过；
+    关系属性仅在 orm_relationships=True 且已被加载(eager/访问过)时输出
+    """
+    loaded = (_sa_inspect or _find_sa_inspect())(obj).dict
+    columns, relationships = attrs
+    data = {key: loaded[key] for key in columns if key in loaded}
+    if orm_relationships:
+        for key in relationships:
+            if key in loaded:
+                data[key] = loaded[key]
+    return data
+
+
+_BUFFER_TYPES = (bytes, bytearray, memoryview)
+ARRAY_MODES = ("list", "base64", "bytes")
+
+
+def encode_buffer(
+    obj: Any, array_mode: str = "list", fallback: Callable = None
+) -> Any:
+    """
+    NumPy 数组/标量及 bytes、bytearray、memoryview 的编码，numpy 在用到时才导入
+
+    * list: ndarray/memoryview 通过 tolist() 在 C 层转换为原生列表，bytes 按 utf-8 解码
+    * base64: 数值型 ndarray 输出 {"dtype", "shape", "data"}，data 为原始字节的 base64；
+      bytes/memoryview 输出 base64 字符串
+    * bytes: 数值型 ndarray、memoryview 输出原始字节，bytes 原样返回
+
+    :param obj:
+    :param array_mode: list/base64/bytes
+    :param fallback: 编码 object/datetime64 等数组 tolist() 后的元素
+    :return:
+    """
+    if array_mode not in ARRAY_MODES:
+        raise ValueError("array_mode must be one of %s" % (ARRAY_MODES,))
+    if isinstance(obj, _BUFFER_TYPES):
+        if array_mode == "base64":
+            return base64.b64encode(obj).decode()
+        if array_mode == "bytes":
+            return bytes(obj)
+        if isinstance(obj, memoryview):
+            return obj.tolist()
+        return bytes(obj).decode()
+
+    import numpy
+
+    if isinstance(obj, numpy.generic):
+        value = obj.item()
+        if fallback is not None and not isinstance(value, _SCALAR_TYPES):
+            return fallback(value)
+        return value
+    if not isinstance(obj, numpy.ndarray):
+        raise ValueError("Unsupported numpy object: %s" % type(obj).__name__)
+    if obj.dtype.kind in "biuf" and array_mode != "list":
+        data = numpy.ascontiguousarray(obj).tobytes()
+        if array_mode == "bytes":
+            return data
+        return {
+            "dtype": obj.dtype.str,
+            "shape": list(obj.shape),
+            "data": base64.b64encode(data).decode(),
+        }
+    value = obj.tolist()
+    if fallback is not None and obj.dtype.kind not in "biufSU":
+        return fallback(value)
+    return value
+
+
+_RAISE = object()
+# 编码结果是不可变的叶子值，无需记忆化
+_MEMO_SKIP_TYPES = (
+    str, int, float, type(None), bytes, Enum, PurePath, Decimal, UUID,
+    datetime.date, datetime.time, datetime.timedelta,
+)
+
+
+class _EncodeMemo:
+    """
+    一次 jsonable_encoder 调用内的记忆化状态
+
+    results 按 (id(obj), id(include), id(exclude)) 保存编码结果，同时持有原对象，
+    防止临时对象被回收后 id 被复用；active 为当前递归路径上的对象，用于检测循环引用
+    """
+
+    __slots__ = ("results", "active", "pending", "circular_placeholder")
+
+    def __init__(self, circular_placeholder: Any = _RAISE):
+        self.results: Dict[Tuple[int, int, int], Tuple[Any, Any]] = {}
+        self.active: Set[Tuple[int, int, int]] = set()
+        self.pending: Any = None
+        self.circular_placeholder = circular_placeholder
+
+    def encode(self, obj: Any, key: Tuple[int, int, int], encode: Callable) -> Any:
+        if key in self.results:
+            return self.results[key][1]
+        if key in self.active:
+            if self.circular_placeholder is _RAISE:
+                raise ValueError(
+                    "Circular reference detected: %s" % type(obj).__name__)
+            return self.circular_placeholder
+        self.active.add(key)
+        self.pending = obj
+        try:
+            result = encode()
+        finally:
+            self.active.discard(key)
+        self.results[key] = (obj, result)
+        return result
 
 
 def jsonable_encoder(
@@ -44,31 +268,46 @@ def jsonable_encoder(
     exclude_none: bool = False,
     custom_encoder: dict = {},
     sqlalchemy_safe: bool = True,
+    orm_relationships: bool = False,
+    array_mode: str = "list",
+    memoize: bool = False,
+    circular_placeholder: Any = _RAISE,
+    _memo: "_EncodeMemo" = None,
 ) -> Any:
+    """
+    :param array_mode: NumPy 数组、bytes、memoryview 的输出方式，见 encode_buffer
+    :param memoize: 同一次调用内按对象 id 复用已编码的子对象，并检测循环引用；
+        重复出现的子对象在结果中共享同一份编码值
+    :param circular_placeholder: 检测到循环引用时的替代值，不传则抛出 ValueError
+    :param orm_relationships: 输出已加载的 ORM 关系属性；双向关系(back_populates)
+        会形成循环，因此该选项会自动开启 memoize
+    """
+    if (memoize or orm_relationships) and _memo is None:
+        _memo = _EncodeMemo(circular_placeholder)
+    if _memo is not None:
+        if _memo.pending is obj:
+            _memo.pending = None
+        elif not isinstance(obj, _MEMO_SKIP_TYPES):
+            key = (id(obj), id(include), id(exclude))
+            return _memo.encode(obj, key, partial(
+                jsonable_encoder,
+                obj,
+                include=include,
+                exclude=exclude,
+                by_alias=by_alias,
+                exclude_unset=exclude_unset,
+                exclude_defaults=exclude_defaults,
+                exclude_none=exclude_none,
+                custom_encoder=custom_encoder,
+                sqlalchemy_safe=sqlalchemy_safe,
+                orm_relationships=orm_relationships,
+                array_mode=array_mode,
+                _memo=_memo,
+            ))
     if include is not None and not isinstance(include, set):
         include = set(include)
     if exclude is not None and not isinstance(exclude, set):
         exclude = set(exclude)
-    if isinstance(obj, BaseModel):
-        encoder = getattr(obj.Config, "json_encoders", {})
-        if custom_encoder:
-            encoder.update(custom_encoder)
-        obj_dict = obj.dict(
-            include=include,
-            exclude=exclude,
-            by_alias=by_alias,
-            exclude_unset=exclude_unset,
-            exclude_none=exclude_none,
-            exclude_defaults=exclude_defaults,
-        )
-
-        return jsonable_encoder(
-            obj_dict,
-            exclude_none=exclude_none,
-            exclude_defaults=exclude_defaults,
-            custom_encoder=encoder,
-            sqlalchemy_safe=sqlalchemy_safe,
-        )
     if isinstance(obj, Enum):
         return obj.value
     if isinstance(obj, PurePath):
@@ -94,6 +333,9 @@ def jsonable_encoder(
                     exclude_none=exclude_none,
                     custom_encoder=custom_encoder,
                     sqlalchemy_safe=sqlalchemy_safe,
+                    orm_relationships=orm_relationships,
+                    array_mode=array_mode,
+                    _memo=_memo,
                 )
                 encoded_value = jsonable_encoder(
                     value,
@@ -102,6 +344,9 @@ def jsonable_encoder(
                     exclude_none=exclude_none,
                     custom_encoder=custom_encoder,
                     sqlalchemy_safe=sqlalchemy_safe,
+                    orm_relationships=orm_relationships,
+                    array_mode=array_mode,
+                    _memo=_memo,
                 )
                 encoded_dict[encoded_key] = encoded_value
         return encoded_dict
@@ -119,10 +364,38 @@ def jsonable_encoder(
                     exclude_none=exclude_none,
                     custom_encoder=custom_encoder,
                     sqlalchemy_safe=sqlalchemy_safe,
+                    orm_relationships=orm_relationships,
+                    array_mode=array_mode,
+                    _memo=_memo,
                 )
             )
         return encoded_list
 
+    # 在容器/标量判断之后检查，常见类型不必查找 pydantic
+    base_model = _pydantic_base_model or _find_pydantic_base_model()
+    if base_model is not None and isinstance(obj, base_model):
+        encoder = getattr(obj.Config, "json_encoders", {})
+        if custom_encoder:
+            encoder.update(custom_encoder)
+        obj_dict = obj.dict(
+            include=include,
+            exclude=exclude,
+            by_alias=by_alias,
+            exclude_unset=exclude_unset,
+            exclude_none=exclude_none,
+            exclude_defaults=exclude_defaults,
+        )
+
+        return jsonable_encoder(
+            obj_dict,
+            exclude_none=exclude_none,
+            exclude_defaults=exclude_defaults,
+            custom_encoder=encoder,
+            sqlalchemy_safe=sqlalchemy_safe,
+            orm_relationships=orm_relationships,
+            array_mode=array_mode,
+            _memo=_memo,
+        )
     if custom_encoder:
         if type(obj) in custom_encoder:
             return custom_encoder[type(obj)](obj)
@@ -131,12 +404,44 @@ def jsonable_encoder(
                 if isinstance(obj, encoder_type):
                     return encoder(obj)
 
-    if type(obj) in ENCODERS_BY_TYPE:
-        return ENCODERS_BY_TYPE[type(obj)](obj)
+    if isinstance(obj, _BUFFER_TYPES) or type(obj).__module__ == "numpy":
+        return encode_buffer(obj, array_mode, partial(
+            jsonable_encoder,
+            by_alias=by_alias,
+            exclude_unset=exclude_unset,
+            exclude_defaults=exclude_defaults,
+            exclude_none=exclude_none,
+            custom_encoder=custom_encoder,
+            sqlalchemy_safe=sqlalchemy_safe,
+            orm_relationships=orm_relationships,
+            array_mode=array_mode,
+            _memo=_memo,
+        ))
+
+    encoders_by_type, encoders_by_class_tuples = (
+        _pydantic_encoders or _get_pydantic_encoders())
+    if type(obj) in encoders_by_type:
+        return encoders_by_type[type(obj)](obj)
     for encoder, classes_tuple in encoders_by_class_tuples.items():
         if isinstance(obj, classes_tuple):
             return encoder(obj)
 
+    orm_attrs = get_orm_attrs(type(obj))
+    if orm_attrs is not None:
+        data = orm_loaded_data(obj, orm_attrs, orm_relationships)
+        return jsonable_encoder(
+            data,
+            by_alias=by_alias,
+            exclude_unset=exclude_unset,
+            exclude_defaults=exclude_defaults,
+            exclude_none=exclude_none,
+            custom_encoder=custom_encoder,
+            sqlalchemy_safe=sqlalchemy_safe,
+            orm_relationships=orm_relationships,
+            array_mode=array_mode,
+            _memo=_memo,
+        )
+
     errors: List[Exception] = []
     try:
         data = dict(obj)
@@ -155,4 +460,208 @@ def jsonable_encoder(
         exclude_none=exclude_none,
         custom_encoder=custom_encoder,
         sqlalchemy_safe=sqlalchemy_safe,
-    )
\ No newline at end of file
+        orm_relationships=orm_relationships,
+        array_mode=array_mode,
+        _memo=_memo,
+    )
+
+
+class _Missing:
+    """ORM 行中未加载的列"""
+
+
+_MISSING = _Missing()
+_SCALAR_TYPES = (str, int, float, type(None))
+_CONTAINER_TYPES = (dict, list, set, frozenset, GeneratorType, tuple)
+
+
+def _resolve_type_encoder(
+    type_: type, custom_encoder: dict, fallback: Callable
+) -> Optional[Callable]:
+    """
+    按 jsonable_encoder 的分派顺序为某个类型解析编码函数
+
+    :return: None 表示原样输出，否则为单参数的编码函数
+    """
+    if type_ is _Missing:
+        return None
+    base_model = _pydantic_base_model or _find_pydantic_base_model()
+    if issubclass(type_, _CONTAINER_TYPES) or (
+            base_model is not None and issubclass(type_, base_model)):
+        return fallback
+    if issubclass(type_, Enum):
+        return attrgetter("value")
+    if issubclass(type_, PurePath):
+        return str
+    if issubclass(type_, _SCALAR_TYPES):
+        return None
+    if custom_encoder:
+        if type_ in custom_encoder:
+            return custom_encoder[type_]
+        for encoder_type, encoder in custom_encoder.items():
+            if issubclass(type_, encoder_type):
+                return encoder
+    if issubclass(type_, _BUFFER_TYPES) or type_.__module__ == "numpy":
+        return fallback
+    encoders_by_type, encoders_by_class_tuples = _get_pydantic_encoders()
+    if type_ in encoders_by_type:
+        return encoders_by_type[type_]
+    for encoder, classes_tuple in encoders_by_class_tuples.items():
+        if issubclass(type_, classes_tuple):
+            return encoder
+    return fallback
+
+
+def _encode_column(
+    values: List[Any], resolved: Dict[type, Optional[Callable]], resolve: Callable
+) -> List[Any]:
+    """对同一列的值编码，每种类型只解析一次编码函数"""
+    types = set(map(type, values))
+    for type_ in types:
+        if type_ not in resolved:
+            resolved[type_] = resolve(type_)
+    if len(types) == 1:
+        encoder = resolved[types.pop()]
+        return values if encoder is None else list(map(encoder, values))
+    if all(resolved[type_] is None for type_ in types):
+        return values
+    encoded = []
+    for value in values:
+        encoder = resolved[type(value)]
+        encoded.append(value if encoder is None else encoder(value))
+    return encoded
+
+
+def _records_to_columns(records: List[Any]) -> Dict[Any, List[Any]]:
+    keys: Dict[Any, None] = {}
+    for record in records:
+        for key in record:
+            keys.setdefault(key)
+    return {key: [record.get(key) for record in records] for key in keys}
+
+
+def jsonable_encoder_bulk(
+    rows: Sequence[Any],
+    orient: str = "records",
+    by_alias: bool = True,
+    exclude_none: bool = False,
+    custom_encoder: dict = {},
+    sqlalchemy_safe: bool = True,
+    orm_relationships: bool = False,
+    array_mode: str = "list",
+    memoize: bool = False,
+    circular_placeholder: Any = _RAISE,
+) -> Union[List[Any], Dict[Any, List[Any]]]:
+    """
+    同构列表(ORM 对象/Pydantic 模型/dict)的批量编码
+
+    按列取值，每列每种类型只解析一次编码函数，避免逐行逐字段重复分派；
+    非同构列表退化为逐行 jsonable_encoder
+
+    :param rows: 行列表
+    :param orient: records 返回 [{col: v}, ...]，未加载的列不输出；
+        columns 返回 {col: [v, ...]}，所有行都未加载的列不输出，部分行未加载时以 None 填充
+    :param by_alias:
+    :param exclude_none: 仅对 records 生效
+    :param custom_encoder:
+    :param sqlalchemy_safe:
+    :param orm_relationships: 同 jsonable_encoder，会自动开启 memoize
+    :param array_mode:
+    :param memoize: 同 jsonable_encoder，所有行共用一份记忆化状态
+    :param circular_placeholder:
+    :return:
+    """
+    if orient not in ("records", "columns"):
+        raise ValueError("orient must be 'records' or 'columns'")
+    rows = list(rows)
+    if not rows:
+        return [] if orient == "records" else {}
+
+    row_type = type(rows[0])
+    homogeneous = all(type(row) is row_type for row in rows)
+    orm_attrs = get_orm_attrs(row_type) if homogeneous else None
+    keys: Sequence[Any]
+    if orm_attrs is not None:
+        keys = orm_attrs[0] + (orm_attrs[1] if orm_relationships else ())
+        sa_inspect = _sa_inspect or _find_sa_inspect()
+        sources = [sa_inspect(row).dict for row in rows]
+        names = keys
+    elif homogeneous and is_pydantic_model(rows[0]):
+        fields = row_type.__fields__
+        keys = tuple(fields)
+        sources = [row.__dict__ for row in rows]
+        names = tuple(
+            field.alias if by_alias else key for key, field in fields.items()
+        )
+        model_encoders = getattr(row_type.Config, "json_encoders", {})
+        if model_encoders:
+            custom_encoder = {**model_encoders, **custom_encoder}
+    elif homogeneous and row_type is dict:
+        key_set: Dict[Any, None] = {}
+        for row in rows:
+            for key in row:
+                key_set.setdefault(key)
+        keys = tuple(key_set)
+        if not all(isinstance(key, str) for key in keys):
+            keys = ()
+        elif sqlalchemy_safe:
+            keys = tuple(key for key in keys if not key.startswith("_sa"))
+        sources = rows
+        names = keys
+    else:
+        keys = ()
+
+    fallback = partial(
+        jsonable_encoder,
+        by_alias=by_alias,
+        exclude_none=exclude_none,
+        custom_encoder=custom_encoder,
+        sqlalchemy_safe=sqlalchemy_safe,
+        orm_relationships=orm_relationships,
+        array_mode=array_mode,
+        _memo=(_EncodeMemo(circular_placeholder)
+               if memoize or orm_relationships else None),
+    )
+    if not keys:
+        records = [fallback(row) for row in rows]
+        if orient == "records":
+            return records
+        return _records_to_columns(records)
+
+    resolved: Dict[type, Optional[Callable]] = {}
+    resolve = partial(
+        _resolve_type_encoder, custom_encoder=custom_encoder, fallback=fallback
+    )
+    columns = []
+    has_missing = False
+    for key in keys:
+        values = [source.get(key, _MISSING) for source in sources]
+        column = _encode_column(values, resolved, resolve)
+        if _Missing in resolved and not has_missing:
+            has_missing = any(value is _MISSING for value in column)
+        columns.append(column)
+
+    if orient == "columns":
+        if not has_missing:
+            return dict(zip(names, columns))
+        encoded_columns = {}
+        for name, column in zip(names, columns):
+            missing = sum(value is _MISSING for value in column)
+            if not missing:
+                encoded_columns[name] = column
+            elif missing < len(column):
+                encoded_columns[name] = [
+                    None if value is _MISSING else value for value in column
+                ]
+        return encoded_columns
+
+    if not has_missing and not exclude_none:
+        return [dict(zip(names, values)) for values in zip(*columns)]
+    return [
+        {
+            name: value
+            for name, value in zip(names, values)
+            if value is not _MISSING and (value is not None or not exclude_none)
+        }
+        for values in zip(*columns)
+    ]
@@ -0,0 +1,168 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: 按主键范围分片、多进程并行导出整表为 JSON Lines
+
+    result = export_jsonl("sqlite:///data.db", Item, "out/", workers=4,
+                          compress=True, progress=print)
+
+每个分片由一个子进程负责: 子进程用 url 创建自己的 engine/Session，
+在分片的主键范围内按主键分批(keyset)读取列数据，批量编码后逐行写入
+<表名>-<分片号>.jsonl[.gz]。模型类需可被子进程导入(定义在模块顶层)
+"""
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+
+from .encoders import get_orm_columns, jsonable_encoder_bulk
+
+
+def _pk_column(model: Type) -> Any:
+    mapper = model.__mapper__
+    if len(mapper.primary_key) != 1:
+        raise ValueError("export_jsonl requires a single-column primary key")
+    prop = mapper.get_property_by_column(mapper.primary_key[0])
+    return getattr(model, prop.key)
+
+
+def split_ranges(low: int, high: int, shards: int) -> List[Tuple[int, int]]:
+    """
+    把闭区间 [low, high] 切成最多 shards 个左闭右开的整数区间
+
+    :param low:
+    :param high:
+    :param shards:
+    :return:
+    """
+    total = high - low + 1
+    shards = max(1, min(shards, total))
+    step, extra = divmod(total, shards)
+    ranges = []
+    start = low
+    for i in range(shards):
+        end = start + step + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _export_shard(
+        url: str, model: Type, path: str, low: int, high: int,
+        opt: Optional[dict], chunk_size: int, compress: bool,
+        engine_kwargs: Optional[dict]
+) -> Tuple[str, int]:
+    engine = create_engine(url, **(engine_kwargs or {}))
+    pk = _pk_column(model)
+    names = get_orm_columns(model)
+    columns = [getattr(model, name) for name in names]
+    opener = gzip.open if compress else open
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    rows = 0
+    try:
+        with Session(bind=engine) as db, \
+                opener(path, "wt", encoding="utf-8") as f:
+            last = None
+            while True:
+                query = db.query(*columns).filter(pk >= low, pk < high)
+                if opt:
+                    query = query.filter_by(**opt)
+                if last is not None:
+                    query = query.filter(pk > last)
+                batch = query.order_by(pk).limit(chunk_size).all()
+                if not batch:
+                    break
+                last = getattr(batch[-1], pk.key)
+                records = jsonable_encoder_bulk(
+                    [dict(zip(names, row)) for row in batch])
+                f.writelines(dumps(record) + "\n" for record in records)
+                rows += len(batch)
+    finally:
+        engine.dispose()
+    return path, rows
+
+
+def export_jsonl(
+        url: str, model: Type, out_dir: str, *,
+        workers: int = None,
+        shards: int = None,
+        chunk_size: int = 5000,
+        compress: bool = False,
+        opt: dict = None,
+        progress: Callable[[Dict[str, Any]], None] = None,
+        engine_kwargs: dict = None
+) -> Dict[str, Any]:
+    """
+    并行导出整表为 JSON Lines 分片
+
+    :param url: 数据库连接串，子进程各自创建 engine
+    :param model: ORM 模型类，需为整数单列主键
+    :param out_dir: 输出目录
+    :param workers: 进程数，默认 CPU 核数
+    :param shards: 分片数，默认 workers * 4，分片越多进度越细、负载越均衡
+    :param chunk_size: 每次查询的行数
+    :param compress: 是否 gzip 压缩
+    :param opt: 同 CRUDBase.list 的 filter_by 条件
+    :param progress: 每完成一个分片调用一次，参数为
+        {"shards_done", "shards_total", "rows", "seconds", "rows_per_sec"}
+    :param engine_kwargs: create_engine 的额外参数
+    :return: {"files", "rows", "seconds", "rows_per_sec"}
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers * 4
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+
+    engine = create_engine(url, **(engine_kwargs or {}))
+    try:
+        with Session(bind=engine) as db:
+            pk = _pk_column(model)
+            low, high = db.query(func.min(pk), func.max(pk)).one()
+    finally:
+        # 子进程不能复用父进程的连接
+        engine.dispose()
+
+    files: List[str] = []
+    rows = 0
+    if low is None:
+        return {"files": files, "rows": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+
+    ranges = split_ranges(int(low), int(high), shards)
+    suffix = ".jsonl.gz" if compress else ".jsonl"
+    table = model.__table__.name
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _export_shard, url, model,
+                os.path.join(out_dir, "%s-%05d%s" % (table, i, suffix)),
+                start, end, opt, chunk_size, compress, engine_kwargs)
+            for i, (start, end) in enumerate(ranges)
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            path, count = future.result()
+            files.append(path)
+            rows += count
+            if progress is not None:
+                seconds = time.perf_counter() - started
+                progress({
+                    "shards_done": done,
+                    "shards_total": len(futures),
+                    "rows": rows,
+                    "seconds": seconds,
+                    "rows_per_sec": rows / seconds if seconds else 0.0,
+                })
+
+    seconds = time.perf_counter() - started
+    return {
+        "files": sorted(files),
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+    }
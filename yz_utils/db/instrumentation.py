@@ -0,0 +1,331 @@
+#!/usr/bin/python3.6+
+# -*- coding:utf-8 -*-
+"""
+@auth: cml
+@date: 2026-10-19
+@desc: CRUDBase 的 SQL 统计与慢查询日志
+
+基于 SQLAlchemy 的 before/after_cursor_execute 和 handle_error 事件:
+    * 按 (模型, CRUD 方法) 统计语句数、失败数和数据库耗时
+    * 超过阈值的语句和执行失败的语句通过 yz_utils.logger.get_logger 记录，绑定参数默认脱敏
+    * collect() 收集当前上下文(请求)内的语句，n_plus_one() 找出重复执行的语句
+
+未安装 SQLInstrument 时，CRUDBase 方法只多一次全局开关判断
+
+    instrument = SQLInstrument(engine, slow_threshold=0.2).install()
+    with collect() as summary:
+        handle_request()
+    summary.n_plus_one()
+"""
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# 已安装的 SQLInstrument 数量，为 0 时 crud_operation 直接调用原方法
+_enabled = 0
+_current_operation: ContextVar[Optional[Tuple[str, str]]] = ContextVar(
+    "yz_crud_operation", default=None)
+_current_summary: ContextVar[Optional["QuerySummary"]] = ContextVar(
+    "yz_query_summary", default=None)
+
+UNKNOWN_OPERATION = ("-", "-")
+_QUERY_START = "yz_query_start"
+
+
+def crud_operation(fn: Callable) -> Callable:
+    """
+    标记 CRUDBase/AsyncCRUDBase 的方法(普通、生成器或协程函数)，
+    使其执行的语句归属到 (模型名, 方法名)
+
+    :param fn:
+    :return:
+    """
+    name = fn.__name__
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def gen_wrapper(self, *args, **kwargs):
+            gen = fn(self, *args, **kwargs)
+            if not _enabled:
+                return gen
+            return _tag_generator(gen, (self.model.__name__, name))
+        return gen_wrapper
+
+    if inspect.iscoroutinefunction(fn):
+        # 协程在 await 时才执行，需要在协程内部设置，每个 Task 有独立的上下文
+        @functools.wraps(fn)
+        async def async_wrapper(self, *args, **kwargs):
+            if not _enabled:
+                return await fn(self, *args, **kwargs)
+            token = _current_operation.set((self.model.__name__, name))
+            try:
+                return await fn(self, *args, **kwargs)
+            finally:
+                _current_operation.reset(token)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if not _enabled:
+            return fn(self, *args, **kwargs)
+        token = _current_operation.set((self.model.__name__, name))
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            _current_operation.reset(token)
+    return wrapper
+
+
+def _tag_generator(gen: Iterator, operation: Tuple[str, str]) -> Iterator:
+    try:
+        while True:
+            token = _current_operation.set(operation)
+            try:
+                item = next(gen)
+            except StopIteration:
+                return
+            finally:
+                _current_operation.reset(token)
+            yield item
+    finally:
+        gen.close()
+
+
+class OperationStats:
+    __slots__ = ("statements", "errors", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def add(self, seconds: float, failed: bool = False):
+        self.statements += 1
+        self.errors += failed
+        self.seconds += seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "statements": self.statements,
+            "errors": self.errors,
+            "seconds": self.seconds,
+        }
+
+
+class QuerySummary:
+    """
+    一个上下文(通常是一次请求)内执行的语句统计
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.by_operation: Dict[Tuple[str, str], OperationStats] = {}
+        self.by_statement: Dict[str, OperationStats] = {}
+
+    def add(
+            self, operation: Tuple[str, str], statement: str, seconds: float,
+            failed: bool = False
+    ):
+        self.statements += 1
+        self.errors += failed
+        self.seconds += seconds
+        stats = self.by_operation.get(operation)
+        if stats is None:
+            stats = self.by_operation[operation] = OperationStats()
+        stats.add(seconds, failed)
+        stats = self.by_statement.get(statement)
+        if stats is None:
+            stats = self.by_statement[statement] = OperationStats()
+        stats.add(seconds, failed)
+
+    def n_plus_one(self, threshold: int = 5) -> List[Tuple[str, int]]:
+        """
+        同一条语句(相同 SQL，不同参数)执行次数达到 threshold 的列表，通常是循环查询
+
+        :param threshold:
+        :return: [(statement, count)]，按次数降序
+        """
+        repeated = [
+            (statement, stats.statements)
+            for statement, stats in self.by_statement.items()
+            if stats.statements >= threshold
+        ]
+        return sorted(repeated, key=lambda item: -item[1])
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "statements": self.statements,
+            "errors": self.errors,
+            "seconds": self.seconds,
+            "operations": {
+                "%s.%s" % operation: stats.as_dict()
+                for operation, stats in self.by_operation.items()
+            },
+        }
+
+
+@contextmanager
+def collect() -> Iterator[QuerySummary]:
+    """
+    收集当前上下文内所有已安装 SQLInstrument 的引擎执行的语句
+
+    :return:
+    """
+    summary = QuerySummary()
+    token = _current_summary.set(summary)
+    try:
+        yield summary
+    finally:
+        _current_summary.reset(token)
+
+
+def redact(parameters: Any) -> Any:
+    """保留参数结构，值替换为类型名"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(value) if isinstance(value, (dict, list, tuple))
+                else type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class SQLInstrument:
+    """
+    为引擎安装 SQL 统计与慢查询日志
+
+    :param engine: Engine，或 AsyncEngine(使用其 sync_engine)
+    :param slow_threshold: 慢查询阈值(秒)，None 表示不记录
+    :param logger: 日志对象，默认首次记录时 get_logger(app_name)
+    :param app_name:
+    :param redact_params: 日志中是否隐藏绑定参数的值
+    :param log_errors: 是否记录执行失败(含超时)的语句，脱敏时不记录数据库返回的错误信息
+    """
+
+    def __init__(
+            self, engine: Any,
+            slow_threshold: Optional[float] = 0.5,
+            logger: Any = None,
+            app_name: str = "sql",
+            redact_params: bool = True,
+            log_errors: bool = True
+    ):
+        self.engine = getattr(engine, "sync_engine", engine)
+        self.slow_threshold = slow_threshold
+        self.redact_params = redact_params
+        self.log_errors = log_errors
+        self.app_name = app_name
+        self._logger = logger
+        self._installed = False
+        self._lock = threading.Lock()
+        self.operations: Dict[Tuple[str, str], OperationStats] = {}
+
+    @property
+    def logger(self):
+        if self._logger is None:
+            from yz_utils.logger import get_logger
+            self._logger = get_logger(self.app_name)
+        return self._logger
+
+    def install(self) -> "SQLInstrument":
+        global _enabled
+        if not self._installed:
+            event.listen(self.engine, "before_cursor_execute", self._before)
+            event.listen(self.engine, "after_cursor_execute", self._after)
+            event.listen(self.engine, "handle_error", self._on_error)
+            self._installed = True
+            _enabled += 1
+        return self
+
+    def uninstall(self):
+        global _enabled
+        if self._installed:
+            event.remove(self.engine, "before_cursor_execute", self._before)
+            event.remove(self.engine, "after_cursor_execute", self._after)
+            event.remove(self.engine, "handle_error", self._on_error)
+            self._installed = False
+            _enabled -= 1
+
+    # 开始时间保存在每次执行的 ExecutionContext 上: 语句失败时 after_cursor_execute
+    # 不会触发，保存为连接上的列表会在连接池的连接中不断累积；
+    # 方言内部的语句(如预取序列)没有 context，使用连接上会被覆盖的单个值
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._yz_query_start = time.perf_counter()
+        else:
+            conn.info[_QUERY_START] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            start = context._yz_query_start
+        else:
+            start = conn.info.pop(_QUERY_START)
+        seconds = time.perf_counter() - start
+        operation = self._record(statement, seconds)
+        if self.slow_threshold is not None and seconds >= self.slow_threshold:
+            self.logger.warning(
+                "slow query %.3fs [%s.%s]%s %s | params: %s",
+                seconds, operation[0], operation[1],
+                " executemany" if executemany else "",
+                " ".join(statement.split()), self._params(parameters))
+
+    def _on_error(self, exception_context):
+        context = exception_context.execution_context
+        if context is not None:
+            start = getattr(context, "_yz_query_start", None)
+        elif exception_context.connection is not None:
+            start = exception_context.connection.info.pop(_QUERY_START, None)
+        else:
+            start = None
+        if start is None:
+            # 语句执行之前(如建立连接、编译)出错
+            return
+        seconds = time.perf_counter() - start
+        statement = exception_context.statement or ""
+        operation = self._record(statement, seconds, failed=True)
+        if self.log_errors:
+            error = exception_context.original_exception
+            # 数据库错误信息可能包含行数据(如唯一键冲突的值)，脱敏时只记录异常类型
+            self.logger.warning(
+                "failed query %.3fs [%s.%s] %s | params: %s | %s",
+                seconds, operation[0], operation[1],
+                " ".join(statement.split()),
+                self._params(exception_context.parameters),
+                type(error).__name__ if self.redact_params
+                else "%s: %s" % (type(error).__name__, error))
+
+    def _record(
+            self, statement: str, seconds: float, failed: bool = False
+    ) -> Tuple[str, str]:
+        operation = _current_operation.get() or UNKNOWN_OPERATION
+        with self._lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = OperationStats()
+            stats.add(seconds, failed)
+        summary = _current_summary.get()
+        if summary is not None:
+            summary.add(operation, statement, seconds, failed)
+        return operation
+
+    def _params(self, parameters: Any) -> Any:
+        return redact(parameters) if self.redact_params else parameters
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """安装以来按 "模型.方法" 汇总的语句数和耗时"""
+        with self._lock:
+            return {
+                "%s.%s" % operation: stats.as_dict()
+                for operation, stats in self.operations.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self.operations.clear()
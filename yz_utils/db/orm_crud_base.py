@@ -5,13 +5,35 @@
 @date: 2020-6-30
 @desc: ...
 """
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+import copy
+import datetime
+import decimal
+import json
+import uuid
+from contextlib import contextmanager
+from enum import Enum
+from functools import partial
+from itertools import islice
+from typing import (
+    TYPE_CHECKING, Any, Dict, Generic, Iterator, List, Optional, Sequence,
+    Tuple, Type, TypeVar, Union
+)
 
-from pydantic import BaseModel
-from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    and_, bindparam, delete, func, inspect, or_, select, text, tuple_, update
+)
+from sqlalchemy.orm import Session, make_transient_to_detached
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
-from .encoders import jsonable_encoder
+from .cache import CacheBackend, LRUCache, ReadThroughCache, StatementCache
+from .encoders import (
+    get_orm_attrs, get_orm_columns, is_pydantic_model, jsonable_encoder,
+    jsonable_encoder_bulk, orm_loaded_data
+)
+from .instrumentation import crud_operation
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
 
 
 @as_declarative()
@@ -25,48 +47,568 @@ class Base:
     __name__: str
 
 
+def supports_returning(db: Session, kind: str, model: Any = None) -> bool:
+    """
+    当前连接的方言是否支持 INSERT/UPDATE/DELETE ... RETURNING
+
+    :param db:
+    :param kind: insert/update/delete
+    :param model: 用于多数据库绑定时选择连接
+    :return:
+    """
+    dialect = db.get_bind(model).dialect
+    supported = getattr(dialect, "%s_returning" % kind, None)  # SQLAlchemy 2.0
+    if supported is None:
+        supported = getattr(dialect, "full_returning", False)  # SQLAlchemy 1.4
+    return bool(supported)
+
+
+def iter_batches(
+        rows: Sequence[Dict[str, Any]], size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    按顺序切分批次，每批不超过 size 行且所有行的键相同(executemany 的要求)
+
+    :param rows:
+    :param size:
+    :return:
+    """
+    batch: List[Dict[str, Any]] = []
+    keys = None
+    for row in rows:
+        row_keys = row.keys()
+        if batch and (len(batch) >= size or row_keys != keys):
+            yield batch
+            batch = []
+        if not batch:
+            keys = row_keys
+        batch.append(row)
+    if batch:
+        yield batch
+
+
+def _parse_sort(model: Any, sort: Optional[List[str]]) -> List[Tuple[Any, bool]]:
+    """
+    将 ["created_at desc", "name"] 解析为 [(列属性, 是否降序)]，并补上主键作为唯一排序键
+
+    keyset 条件不处理 NULL，排序列必须是 NOT NULL 的映射列，否则抛出 ValueError
+
+    :param model:
+    :param sort:
+    :return:
+    """
+    columns = get_orm_columns(model)
+    keys = []
+    for item in sort or []:
+        parts = item.split()
+        direction = parts[1].lower() if len(parts) == 2 else "asc"
+        if (not parts or parts[0] not in columns or len(parts) > 2
+                or direction not in ("asc", "desc")):
+            raise ValueError("Invalid keyset sort: %r" % item)
+        prop = model.__mapper__.column_attrs[parts[0]]
+        if any(getattr(column, "nullable", True) for column in prop.columns):
+            raise ValueError("Keyset sort column must be NOT NULL: %r" % parts[0])
+        keys.append((getattr(model, parts[0]), direction == "desc"))
+    names = {column.key for column, _ in keys}
+    for column in model.__mapper__.primary_key:
+        attr = getattr(model, model.__mapper__.get_property_by_column(column).key)
+        if attr.key not in names:
+            keys.append((attr, keys[-1][1] if keys else False))
+    return keys
+
+
+# 游标中以字符串保存的类型: 按列的 python_type 还原，Enum 子类另行处理
+_CURSOR_TYPES = (
+    (datetime.datetime, datetime.datetime.fromisoformat),
+    (datetime.date, datetime.date.fromisoformat),
+    (datetime.time, datetime.time.fromisoformat),
+    (decimal.Decimal, lambda value: decimal.Decimal(str(value))),
+    (uuid.UUID, uuid.UUID),
+)
+
+
+def _encode_cursor_value(value: Any) -> Any:
+    """
+    游标值的无损编码: Decimal 用 str(不经 float)，Enum 用成员名(与 SQLAlchemy
+    Enum 类型的存储一致)，其他值同 jsonable_encoder
+    """
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return jsonable_encoder(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    data = json.dumps(
+        [_encode_cursor_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def _decode_cursor_value(value: Any, python_type: Optional[type]) -> Any:
+    if value is None or python_type is None:
+        return value
+    if issubclass(python_type, Enum):
+        return python_type[value]
+    for type_, decode in _CURSOR_TYPES:
+        if issubclass(python_type, type_):
+            return decode(value)
+    return value
+
+
+def decode_cursor(cursor: str, keys: List[Tuple[Any, bool]]) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError("Invalid cursor")
+    decoded = []
+    for (column, _), value in zip(keys, values):
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = None
+        try:
+            decoded.append(_decode_cursor_value(value, python_type))
+        except (KeyError, TypeError, ValueError, decimal.InvalidOperation):
+            raise ValueError("Invalid cursor")
+    return decoded
+
+
+def keyset_filter(keys: List[Tuple[Any, bool]], values: List[Any]):
+    """
+    (a, b) 在排序方向上位于 (va, vb) 之后的条件:
+    a >= va AND (a > va OR (a = va AND b > vb))，首列的范围条件便于走索引
+
+    :param keys:
+    :param values:
+    :return:
+    """
+    clauses = []
+    for i, (column, desc) in enumerate(keys):
+        equals = [keys[j][0] == values[j] for j in range(i)]
+        after = column < values[i] if desc else column > values[i]
+        clauses.append(and_(*equals, after))
+    first, desc = keys[0]
+    bound = first <= values[0] if desc else first >= values[0]
+    return and_(bound, or_(*clauses))
+
+
+# 不可变的列值，复制缓存行时无需深拷贝
+_IMMUTABLE_VALUE_TYPES = (
+    str, int, float, type(None), bytes, decimal.Decimal, uuid.UUID,
+    datetime.date, datetime.time, datetime.timedelta,
+)
+
+
+def _copy_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """复制一行列数据，可变值深拷贝"""
+    return {
+        key: value if isinstance(value, _IMMUTABLE_VALUE_TYPES)
+        else copy.deepcopy(value)
+        for key, value in row.items()
+    }
+
+
+_BATCH_DEPTH = "yz_crud_batch_depth"
+_BATCH_INVALIDATIONS = "yz_crud_batch_invalidations"
+
+
+def in_batch(db: Session) -> bool:
+    """Session 是否处于 CRUDBase.batch 工作单元中"""
+    return db.info.get(_BATCH_DEPTH, 0) > 0
+
+
+# IN (...) 列表每批的最大参数个数，受各方言绑定参数数量限制
+IN_CHUNK_SIZES = {"sqlite": 999, "mssql": 2000, "oracle": 1000}
+DEFAULT_IN_CHUNK_SIZE = 5000
+# 单条语句绑定参数数量上限，用于多行 VALUES；
+# SQLite 支持 RETURNING 的版本(3.35+)默认上限为 32766
+BIND_PARAM_LIMITS = {"sqlite": 32766, "postgresql": 32767, "mssql": 2000}
+DEFAULT_BIND_PARAM_LIMIT = 32766
+
+
+def _filter_shape(filters: Dict[str, Any]) -> Tuple[Tuple[str, bool], ...]:
+    """filter_by 条件的形状: 排序后的 (字段名, 值是否为 None)，None 需编译为 IS NULL"""
+    return tuple(sorted((key, value is None) for key, value in filters.items()))
+
+
+def _filter_params(filters: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "f_" + key: value for key, value in filters.items() if value is not None
+    }
+
+
 ModelType = TypeVar("ModelType", bound=Base)
-CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
-UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
+CreateSchemaType = TypeVar("CreateSchemaType", bound="BaseModel")
+UpdateSchemaType = TypeVar("UpdateSchemaType", bound="BaseModel")
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    def __init__(
+            self, model: Type[ModelType],
+            cache: CacheBackend = None,
+            cache_none: bool = False,
+            count_cache_ttl: float = None,
+            statement_cache: StatementCache = None
+    ):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
         **Parameters**
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
+        * `cache`: Optional cache backend for `get`, see `yz_utils.db.cache`
+        * `cache_none`: Also cache ids that do not exist
+        * `count_cache_ttl`: Cache `count` results for this many seconds
+        * `statement_cache`: Reuse prebuilt statements in `get`, `count` and
+          `list`, see `yz_utils.db.cache.StatementCache`
         """
         self.model = model
+        self.cache = None
+        if cache is not None:
+            self.cache = ReadThroughCache(
+                cache, model.__table__.name, cache_none=cache_none)
+        self.count_cache = None
+        if count_cache_ttl:
+            self.count_cache = ReadThroughCache(
+                LRUCache(maxsize=1024, ttl=count_cache_ttl),
+                "%s:count" % model.__table__.name)
+        self.statement_cache = statement_cache
+        self._column_keys: Optional[Dict[str, str]] = None
+
+    def _identity(self, obj: ModelType) -> Any:
+        identity = inspect(obj).identity
+        if identity is None:
+            return None
+        return identity[0] if len(identity) == 1 else identity
+
+    def _from_identity_map(self, db: Session, id: Any) -> Optional[ModelType]:
+        ident = id if isinstance(id, tuple) else (id,)
+        key = self.model.__mapper__.identity_key_from_primary_key(ident)
+        return db.identity_map.get(key)
+
+    def _to_row(
+            self, obj: Optional[ModelType]
+    ) -> Optional[Dict[str, Any]]:
+        """对象已加载的列数据，可变值(JSON/ARRAY 等)为副本，之后修改对象不影响缓存"""
+        if obj is None:
+            return None
+        return _copy_row(orm_loaded_data(obj, get_orm_attrs(self.model)))
+
+    def _from_row(
+            self, db: Session, row: Optional[Dict[str, Any]]
+    ) -> Optional[ModelType]:
+        """
+        把列数据(缓存/RETURNING)还原为当前 Session 中的持久化对象，不发出 SQL；
+        可变值先复制，缓存中的行不会被返回的对象修改
+        """
+        if row is None:
+            return None
+        obj = self.model(**_copy_row(row))
+        make_transient_to_detached(obj)
+        return db.merge(obj, load=False)
+
+    def _invalidate(self, db: Session, *ids: Any):
+        if self.cache is None and self.count_cache is None:
+            return
+        ids = [id for id in ids if id is not None]
+        self._invalidate_now(ids)
+        if in_batch(db):
+            # 提交前其他连接仍可能读到旧值并回填，提交后再失效一次
+            db.info.setdefault(_BATCH_INVALIDATIONS, []).append(
+                partial(self._invalidate_now, ids))
 
+    def _invalidate_now(self, ids: List[Any]):
+        if self.cache is not None and ids:
+            self.cache.invalidate(*ids)
+        if self.count_cache is not None:
+            self.count_cache.clear()
+
+    def _commit(self, db: Session):
+        """工作单元中只 flush，由 batch 退出时统一提交"""
+        if in_batch(db):
+            db.flush()
+        else:
+            db.commit()
+
+    @contextmanager
+    def batch(self, db: Session) -> Iterator[Session]:
+        """
+        工作单元: with crud.batch(db): 内的写操作只 flush，不 refresh，
+        正常退出时提交一次，出现异常时回滚
+
+        批处理状态记录在 Session 上，同一 Session 的所有 CRUDBase 共享；
+        可嵌套，只有最外层负责提交
+
+        :param db:
+        :return:
+        """
+        depth = db.info.get(_BATCH_DEPTH, 0)
+        db.info[_BATCH_DEPTH] = depth + 1
+        try:
+            yield db
+            if depth == 0:
+                db.commit()
+        except BaseException:
+            if depth == 0:
+                db.rollback()
+            raise
+        finally:
+            db.info[_BATCH_DEPTH] = depth
+            if depth == 0:
+                for invalidate in db.info.pop(_BATCH_INVALIDATIONS, []):
+                    invalidate()
+
+    def _returned_row(self, row: Any) -> Dict[str, Any]:
+        """RETURNING 返回的 {列名: 值} 转为 {属性名: 值}"""
+        mapper = self.model.__mapper__
+        mapping = row._mapping
+        return {
+            mapper.get_property_by_column(column).key: mapping[column]
+            for column in self.model.__table__.columns
+        }
+
+    def _id_chunks(self, db: Session, ids: Sequence[Any]) -> Iterator[List[Any]]:
+        dialect_name = db.get_bind(self.model).dialect.name
+        size = IN_CHUNK_SIZES.get(dialect_name, DEFAULT_IN_CHUNK_SIZE)
+        ids = list(ids)
+        for start in range(0, len(ids), size):
+            yield ids[start:start + size]
+
+    def _pks_in_rows(self, rows: List[Dict[str, Any]]) -> List[Any]:
+        if self.cache is None:
+            return []
+        keys = [c.key for c in self.model.__table__.primary_key.columns]
+        return [
+            row[keys[0]] if len(keys) == 1 else tuple(row[k] for k in keys)
+            for row in rows if all(k in row for k in keys)
+        ]
+
+    @crud_operation
     def count(self, db: Session, **kwargs):
         """
         获取总数
+
+        直接执行 SELECT count(pk) FROM ... WHERE ...，不包 Query.count() 的子查询；
+        配置了 count_cache_ttl 时按过滤条件缓存，CRUDBase 的写操作会清空该缓存
         :param db:
         :param kwargs:
         :return:
         """
-        count = db.query(self.model).filter_by(**kwargs).count()
-        return count
+        if self.count_cache is None:
+            return self._count(db, kwargs)
+        key = repr(sorted(kwargs.items()))
+        return self.count_cache.get_or_load(key, partial(self._count, db, kwargs))
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
+    def _count(self, db: Session, filters: Dict[str, Any]) -> int:
+        if self.statement_cache is not None:
+            shape = _filter_shape(filters)
+            stmt = self._statement(("count", shape), self._build_count, shape)
+            return db.execute(stmt, _filter_params(filters)).scalar()
+        pk = self.model.__mapper__.primary_key[0]
+        query = db.query(func.count(pk)).select_from(self.model)
+        if filters:
+            query = query.filter_by(**filters)
+        return query.scalar()
+
+    @crud_operation
+    def estimated_count(self, db: Session) -> int:
+        """
+        基于数据库统计信息的估算总数，适合大表的分页总数展示
+
+        PostgreSQL 读 pg_class.reltuples，MySQL 读 information_schema.tables，
+        SQLite 读 ANALYZE 生成的 sqlite_stat1；没有统计信息时退化为精确 count
+
+        :param db:
+        :return:
+        """
+        table = self.model.__table__
+        dialect_name = db.get_bind(self.model).dialect.name
+        estimate = None
+        if dialect_name == "postgresql":
+            estimate = db.execute(
+                text("SELECT reltuples::bigint FROM pg_class "
+                     "WHERE oid = to_regclass(:name)"),
+                {"name": table.fullname}).scalar()
+        elif dialect_name == "mysql":
+            estimate = db.execute(
+                text("SELECT table_rows FROM information_schema.tables "
+                     "WHERE table_schema = COALESCE(:schema, DATABASE()) "
+                     "AND table_name = :name"),
+                {"schema": table.schema, "name": table.name}).scalar()
+        elif dialect_name == "sqlite":
+            has_stat = db.execute(text(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'table' AND name = 'sqlite_stat1'")).scalar()
+            if has_stat:
+                stat = db.execute(
+                    text("SELECT stat FROM sqlite_stat1 WHERE tbl = :name"),
+                    {"name": table.name}).scalar()
+                estimate = int(stat.split()[0]) if stat else None
+        # reltuples 为 -1 表示表从未 ANALYZE
+        if estimate is None or estimate < 0:
+            return self._count(db, {})
+        return int(estimate)
+
+    def _statement(self, key: Tuple[Any, ...], builder, *args) -> Any:
+        return self.statement_cache.get_or_build(
+            (self.model,) + key, partial(builder, *args))
+
+    def _where(self, shape: Tuple[Tuple[str, bool], ...]) -> List[Any]:
+        clauses = []
+        for key, is_none in shape:
+            column = getattr(self.model, key)
+            clauses.append(
+                column.is_(None) if is_none else column == bindparam("f_" + key))
+        return clauses
+
+    def _pk_params(self, id: Any) -> Dict[str, Any]:
+        ident = id if isinstance(id, tuple) else (id,)
+        return {"pk_%d" % i: value for i, value in enumerate(ident)}
+
+    def _build_count(self, shape: Tuple[Tuple[str, bool], ...]) -> Any:
+        pk = self.model.__mapper__.primary_key[0]
+        return select(func.count(pk)).select_from(self.model).where(
+            *self._where(shape))
+
+    def _build_get(self, columns: Optional[Tuple[str, ...]]) -> Any:
+        stmt = select(*self._projection(columns)) if columns else select(self.model)
+        return stmt.where(*[
+            column == bindparam("pk_%d" % i)
+            for i, column in enumerate(self.model.__mapper__.primary_key)
+        ])
+
+    def _build_list(
+            self, shape: Tuple[Tuple[str, bool], ...],
+            sort: Tuple[str, ...], columns: Optional[Tuple[str, ...]]
+    ) -> Any:
+        stmt = select(*self._projection(columns)) if columns else select(self.model)
+        stmt = stmt.where(*self._where(shape))
+        if sort:
+            stmt = stmt.order_by(*[text(s) for s in sort])
+        return stmt.offset(bindparam("yz_offset")).limit(bindparam("yz_limit"))
+
+    def _load(self, db: Session, id: Any) -> Optional[ModelType]:
+        if self.statement_cache is None:
+            return db.query(self.model).get(id)
+        # 与 Query.get 一致: Session 中未过期的对象直接返回，不发出 SQL
+        obj = self._from_identity_map(db, id)
+        if obj is not None and not inspect(obj).expired:
+            return obj
+        stmt = self._statement(("get", None), self._build_get, None)
+        return db.execute(stmt, self._pk_params(id)).scalars().first()
+
+    def _projection(self, columns: Sequence[str]) -> List[Any]:
+        names = get_orm_columns(self.model)
+        unknown = [name for name in columns if name not in names]
+        if unknown:
+            raise ValueError("Unknown columns for %s: %s" % (
+                self.model.__name__, ", ".join(unknown)))
+        return [getattr(self.model, name) for name in columns]
+
+    @crud_operation
+    def get(
+            self, db: Session, id: Any, *,
+            columns: Sequence[str] = None,
+            as_dict: bool = False
+    ) -> Optional[Union[ModelType, Any]]:
         """
         主键查询
 
         :param db:
         :param id:
+        :param columns: 只查询这些列，返回轻量的 Row(命名元组)而不是 ORM 对象，
+            不经过 identity map 和缓存
+        :param as_dict: 与 columns 一起使用，返回 {列名: 值}
         :return:
         """
-        return db.query(self.model).get(id)
+        if columns and self.statement_cache is not None:
+            columns = tuple(columns)
+            stmt = self._statement(("get", columns), self._build_get, columns)
+            row = db.execute(stmt, self._pk_params(id)).first()
+            return row._asdict() if as_dict and row is not None else row
+        if columns:
+            row = db.query(*self._projection(columns)).filter(
+                self.model.id == id).first()
+            return row._asdict() if as_dict and row is not None else row
+        if self.cache is None:
+            return self._load(db, id)
+        # 当前 Session 中已有的对象可能带有未提交的修改，直接返回且不写入缓存
+        obj = self._from_identity_map(db, id)
+        if obj is not None:
+            return obj
+        row = self.cache.get_or_load(
+            id, lambda: self._to_row(self._load(db, id)))
+        return self._from_row(db, row)
+
+    @crud_operation
+    def get_many(
+            self, db: Session, ids: Sequence[Any], *,
+            chunk_size: int = None
+    ) -> List[Optional[ModelType]]:
+        """
+        批量主键查询，避免循环调用 get 产生的 N+1 查询
 
+        依次从 Session 的 identity map、读穿透缓存(若配置)中取，剩余的 id 用分块的
+        IN (...) 查询加载。id 需与主键的 Python 类型一致，复合主键传 tuple
+
+        :param db:
+        :param ids:
+        :param chunk_size: 每条 IN 查询的 id 数，默认按方言的参数上限选择
+        :return: 与 ids 顺序一致的列表，不存在的 id 对应 None
+        """
+        found: Dict[Any, Optional[ModelType]] = {}
+        pending = []
+        for id in dict.fromkeys(ids):
+            obj = self._from_identity_map(db, id)
+            # 已过期的对象访问属性时会逐个 refresh，交给下面的 IN 查询一并加载
+            if obj is not None and not inspect(obj).expired:
+                found[id] = obj
+            else:
+                pending.append(id)
+
+        generation = None
+        if self.cache is not None and pending:
+            generation = self.cache.generation
+            for id, row in self.cache.get_many(pending).items():
+                found[id] = self._from_row(db, row)
+            pending = [id for id in pending if id not in found]
+
+        if pending:
+            mapper = self.model.__mapper__
+            pk_columns = [
+                getattr(self.model, mapper.get_property_by_column(c).key)
+                for c in mapper.primary_key
+            ]
+            if chunk_size is None:
+                dialect_name = db.get_bind(self.model).dialect.name
+                chunk_size = IN_CHUNK_SIZES.get(
+                    dialect_name, DEFAULT_IN_CHUNK_SIZE) // len(pk_columns)
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                if len(pk_columns) == 1:
+                    criterion = pk_columns[0].in_(chunk)
+                else:
+                    criterion = tuple_(*pk_columns).in_(chunk)
+                for obj in db.query(self.model).filter(criterion):
+                    found[self._identity(obj)] = obj
+            if self.cache is not None:
+                for id in pending:
+                    obj = found.get(id)
+                    self.cache.set(id, self._to_row(obj), generation)
+        return [found.get(id) for id in ids]
+
+    @crud_operation
     def list(
             self, db: Session, *,
             opt: dict = None,
             sort: List[str] = None,
             offset: int = 0,
-            limit: int = 100
-    ) -> List[ModelType]:
+            limit: int = 100,
+            columns: Sequence[str] = None,
+            as_dict: bool = False
+    ) -> List[Union[ModelType, Any]]:
         """
         列表查询
 
@@ -75,17 +617,130 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         :param sort:
         :param offset:
         :param limit:
+        :param columns: 只查询这些列，返回轻量的 Row(命名元组)，跳过 ORM 对象的构建
+            和 identity map 登记，适合下拉框、导出等只需少量列的场景
+        :param as_dict: 与 columns 一起使用，返回可直接交给编码器的 dict 列表
         :return:
         """
+        if self.statement_cache is not None:
+            opt = opt or {}
+            shape = _filter_shape(opt)
+            sort = tuple(sort or ())
+            columns = tuple(columns) if columns else None
+            stmt = self._statement(
+                ("list", shape, sort, columns),
+                self._build_list, shape, sort, columns)
+            params = _filter_params(opt)
+            params["yz_offset"] = offset
+            params["yz_limit"] = limit
+            result = db.execute(stmt, params)
+            if not columns:
+                return result.scalars().all()
+            rows = result.all()
+            return [row._asdict() for row in rows] if as_dict else rows
+        if columns:
+            query = db.query(*self._projection(columns))
+        else:
+            query = db.query(self.model)
+        if opt:
+            query = query.filter_by(**opt)
         if sort:
-            sort = [text(s) for s in sort]
+            query = query.order_by(*[text(s) for s in sort])
+        rows = query.offset(offset).limit(limit).all()
+        if columns and as_dict:
+            return [row._asdict() for row in rows]
+        return rows
+
+    @crud_operation
+    def list_by_cursor(
+            self, db: Session, *,
+            opt: dict = None,
+            sort: List[str] = None,
+            cursor: str = None,
+            limit: int = 100
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        游标(keyset)分页: 以上一页最后一行的排序键作为条件，翻页耗时与页码深度无关
+
+        sort 的每一项为 "列名" 或 "列名 asc/desc"，会自动追加主键保证顺序唯一；
+        排序列必须为 NOT NULL 的列(否则抛出 ValueError)，并建有以这些列开头的索引
+
+        :param db:
+        :param opt: 同 list 的 filter_by 条件
+        :param sort:
+        :param cursor: 上一次返回的 next_cursor，None 表示第一页
+        :param limit:
+        :return: (rows, next_cursor)，没有下一页时 next_cursor 为 None
+        """
+        keys = _parse_sort(self.model, sort)
+        query = db.query(self.model)
         if opt:
-            return db.query(self.model).filter_by(
-                **opt).offset(offset).limit(limit).order_by(sort).all()
-        else:
-            return db.query(self.model).offset(
-                offset).limit(limit).order_by(sort).all()
+            query = query.filter_by(**opt)
+        if cursor:
+            query = query.filter(keyset_filter(keys, decode_cursor(cursor, keys)))
+        query = query.order_by(
+            *[column.desc() if desc else column.asc() for column, desc in keys])
+        rows = query.limit(limit + 1).all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, self.cursor_for(rows[-1], sort)
+
+    @crud_operation
+    def stream(
+            self, db: Session, *,
+            opt: dict = None,
+            sort: List[str] = None,
+            chunk_size: int = 1000,
+            chunked: bool = False
+    ) -> Iterator[Union[ModelType, List[ModelType]]]:
+        """
+        流式遍历结果集，内存占用与表大小无关
+
+        使用 yield_per/服务端游标每次只取 chunk_size 行，上一批处理完后从 Session 中
+        expunge，identity map 不会随遍历增长。用于导出/批处理的只读场景，
+        对已产出对象的修改不会被 flush
+
+        :param db:
+        :param opt: 同 list 的 filter_by 条件
+        :param sort:
+        :param chunk_size: 每批行数
+        :param chunked: True 时每次产出一批(list)，否则逐行产出
+        :return:
+        """
+        query = db.query(self.model)
+        if opt:
+            query = query.filter_by(**opt)
+        if sort:
+            query = query.order_by(*[text(s) for s in sort])
+        query = query.execution_options(stream_results=True)
+        rows = iter(query.yield_per(chunk_size))
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            try:
+                if chunked:
+                    yield chunk
+                else:
+                    yield from chunk
+            finally:
+                for obj in chunk:
+                    if obj in db:
+                        db.expunge(obj)
 
+    def cursor_for(self, obj: ModelType, sort: List[str] = None) -> str:
+        """
+        生成从 obj 之后开始翻页的游标
+
+        :param obj:
+        :param sort: 与 list_by_cursor 相同的排序
+        :return:
+        """
+        keys = _parse_sort(self.model, sort)
+        return encode_cursor([getattr(obj, column.key) for column, _ in keys])
+
+    @crud_operation
     def create(
             self, db: Session, *,
             data: Union[Dict[str, Any], CreateSchemaType]
@@ -97,14 +752,257 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         :param data:
         :return:
         """
-        if isinstance(data, BaseModel):
+        if is_pydantic_model(data):
             data = jsonable_encoder(data)
         db_obj = self.model(**data)  # type: ignore
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._commit(db)
+        if not in_batch(db):
+            db.refresh(db_obj)
+        self._invalidate(db, self._identity(db_obj))
         return db_obj
 
+    def _column_key_map(self) -> Dict[str, str]:
+        """列属性名 -> Core 语句使用的列键(Column("title_col") 时两者不同)"""
+        if self._column_keys is None:
+            self._column_keys = {
+                prop.key: prop.columns[0].key
+                for prop in self.model.__mapper__.column_attrs
+            }
+        return self._column_keys
+
+    def _column_keys_of(self, names: Sequence[str]) -> List[str]:
+        """属性名列表转为列键列表，非映射列抛出 ValueError"""
+        column_keys = self._column_key_map()
+        unknown = [name for name in names if name not in column_keys]
+        if unknown:
+            raise ValueError("Unknown columns for %s: %s" % (
+                self.model.__name__, ", ".join(map(str, unknown))))
+        return [column_keys[name] for name in names]
+
+    def _to_rows(
+            self, data: Sequence[Union[Dict[str, Any], CreateSchemaType]]
+    ) -> List[Dict[str, Any]]:
+        """
+        批量写入的数据转为以 Core 列键为键的 dict 列表，供 table.insert() 使用
+
+        :param data: 以属性名为键的 dict 或 Pydantic schema 列表
+        :return:
+        """
+        data = list(data)
+        if data and all(is_pydantic_model(item) for item in data):
+            rows = jsonable_encoder_bulk(data)
+        else:
+            rows = [
+                jsonable_encoder(item) if is_pydantic_model(item) else item
+                for item in data
+            ]
+        column_keys = self._column_key_map()
+        renamed = any(name != key for name, key in column_keys.items())
+        converted = []
+        checked = None
+        for row in rows:
+            if row.keys() != checked:
+                self._column_keys_of(list(row))
+                checked = row.keys()
+            converted.append(
+                {column_keys[name]: value for name, value in row.items()}
+                if renamed else row)
+        return converted
+
+    @crud_operation
+    def create_many(
+            self, db: Session, *,
+            data: Sequence[Union[Dict[str, Any], CreateSchemaType]],
+            chunk_size: int = 1000,
+            return_pks: bool = False
+    ) -> Union[int, List[Any]]:
+        """
+        批量插入: 分块 executemany，整个批次只提交一次，不逐行 refresh
+
+        :param db:
+        :param data: 以属性名为键的 dict 或 Pydantic schema 列表，含非映射列时抛出 ValueError
+        :param chunk_size: 每条 INSERT 语句的最大行数
+        :param return_pks: 返回主键列表；方言支持时用 INSERT ... RETURNING，
+            否则由 bulk_insert_mappings 回填主键。SQLAlchemy 2.0 及不使用 RETURNING 时
+            按输入顺序，SQLAlchemy 1.4 的多行 INSERT ... RETURNING 顺序由数据库决定
+        :return: 插入行数，或 return_pks=True 时的主键列表
+        """
+        rows = self._to_rows(data)
+        table = self.model.__table__
+        returning = return_pks and supports_returning(db, "insert", self.model)
+        dialect = db.get_bind(self.model).dialect
+
+        pks: List[Any] = []
+        for batch in iter_batches(rows, chunk_size):
+            if not return_pks:
+                db.execute(table.insert(), batch)
+            elif returning:
+                for stmt, params in self._insert_returning(dialect, batch):
+                    pks.extend(self._returned_pks(db.execute(stmt, params)))
+            else:
+                pks.extend(self._bulk_insert_pks(db, batch))
+        self._commit(db)
+        self._invalidate(db, *(pks if return_pks else self._pks_in_rows(rows)))
+        return pks if return_pks else len(rows)
+
+    def _bulk_insert_pks(
+            self, db: Session, batch: List[Dict[str, Any]]
+    ) -> List[Any]:
+        """没有 RETURNING 时用 bulk_insert_mappings 插入一批行(列键)并回填主键"""
+        column_keys = self._column_key_map()
+        names = {key: name for name, key in column_keys.items()}
+        mappings = [
+            {names[key]: value for key, value in row.items()} for row in batch
+        ]
+        db.bulk_insert_mappings(self.model, mappings, return_defaults=True)
+        keys = [names[c.key] for c in self.model.__table__.primary_key.columns]
+        return [
+            row[keys[0]] if len(keys) == 1 else tuple(row[key] for key in keys)
+            for row in mappings
+        ]
+
+    def _insert_returning(
+            self, dialect: Any, batch: List[Dict[str, Any]]
+    ) -> Iterator[Tuple[Any, Optional[List[Dict[str, Any]]]]]:
+        """
+        一批键相同的行的 INSERT ... RETURNING 主键语句及其参数
+
+        SQLAlchemy 2.0 使用 executemany + sort_by_parameter_order，结果按输入顺序；
+        1.4 按方言绑定参数上限拆为多行 VALUES 语句，结果顺序由数据库决定
+
+        :param dialect:
+        :param batch:
+        :return: (statement, params)
+        """
+        table = self.model.__table__
+        pk_columns = list(table.primary_key.columns)
+        if getattr(dialect, "insert_executemany_returning_sort_by_parameter_order",
+                   False):  # SQLAlchemy 2.0
+            yield table.insert().returning(
+                *pk_columns, sort_by_parameter_order=True), batch
+            return
+        limit = BIND_PARAM_LIMITS.get(dialect.name, DEFAULT_BIND_PARAM_LIMIT)
+        size = max(1, min(len(batch), limit // max(1, len(batch[0]))))
+        for start in range(0, len(batch), size):
+            yield table.insert().values(
+                batch[start:start + size]).returning(*pk_columns), None
+
+    def _returned_pks(self, result: Any) -> List[Any]:
+        """RETURNING 主键结果，单列主键为值，复合主键为元组"""
+        if len(self.model.__table__.primary_key.columns) == 1:
+            return [row[0] for row in result]
+        return [tuple(row) for row in result]
+
+    @crud_operation
+    def upsert_many(
+            self, db: Session, *,
+            data: Sequence[Union[Dict[str, Any], CreateSchemaType]],
+            index_elements: List[str] = None,
+            update_fields: List[str] = None,
+            chunk_size: int = 1000
+    ) -> int:
+        """
+        批量插入或更新，使用方言的 ON CONFLICT / ON DUPLICATE KEY UPDATE
+
+        :param db:
+        :param data: 以属性名为键的 dict 或 Pydantic schema 列表，含非映射列时抛出 ValueError
+        :param index_elements: 冲突判断的唯一列，默认为主键(MySQL 由唯一索引自动判断)
+        :param update_fields: 冲突时更新的列，默认为数据中除冲突列外的所有列；
+            按批次取与该批数据键的交集，行中没有的列不会被更新为 NULL；
+            传空列表表示冲突时忽略
+        :param chunk_size:
+        :return: 处理的行数
+        """
+        rows = self._to_rows(data)
+        if not rows:
+            return 0
+        dialect_name = db.get_bind(self.model).dialect.name
+        for stmt, batch in self._upsert_batches(
+                dialect_name, rows, index_elements, update_fields, chunk_size):
+            db.execute(stmt, batch)
+        self._commit(db)
+        self._invalidate(db, *self._pks_in_rows(rows))
+        return len(rows)
+
+    def _upsert_batches(
+            self, dialect_name: str, rows: List[Dict[str, Any]],
+            index_elements: Optional[List[str]],
+            update_fields: Optional[List[str]],
+            chunk_size: int
+    ) -> Iterator[Tuple[Any, List[Dict[str, Any]]]]:
+        """
+        upsert_many 的 (语句, 批次)，同一组键的批次复用同一条语句
+
+        :return: (statement, batch)
+        """
+        statements: Dict[Tuple[str, ...], Any] = {}
+        for batch in iter_batches(rows, chunk_size):
+            keys = tuple(batch[0])
+            stmt = statements.get(keys)
+            if stmt is None:
+                stmt = statements[keys] = self._upsert_statement(
+                    dialect_name, keys, index_elements, update_fields)
+            yield stmt, batch
+
+    def _upsert_statement(
+            self, dialect_name: str, keys: Sequence[str],
+            index_elements: Optional[List[str]],
+            update_fields: Optional[List[str]]
+    ) -> Any:
+        """
+        为一批键相同的行构建 upsert 语句，只更新该批数据中存在的列
+
+        :param dialect_name:
+        :param keys: 该批数据的列键(见 _to_rows)
+        :param index_elements: 属性名
+        :param update_fields: 属性名
+        :return:
+        """
+        table = self.model.__table__
+        if index_elements is None:
+            index_keys = [c.key for c in table.primary_key.columns]
+        else:
+            index_keys = self._column_keys_of(index_elements)
+        if update_fields is None:
+            update_keys = [k for k in keys if k not in index_keys]
+        else:
+            update_keys = [
+                k for k in self._column_keys_of(update_fields) if k in keys]
+        index_elements = [table.c[k] for k in index_keys]
+
+        if dialect_name in ("postgresql", "sqlite"):
+            if dialect_name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table)
+            if update_keys:
+                return stmt.on_conflict_do_update(
+                    index_elements=index_elements,
+                    set_={table.c[k]: stmt.excluded[k] for k in update_keys})
+            return stmt.on_conflict_do_nothing(index_elements=index_elements)
+        if dialect_name == "mysql":
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(table)
+            if update_keys:
+                return stmt.on_duplicate_key_update(
+                    {table.c[k]: stmt.inserted[k] for k in update_keys})
+            return stmt.prefix_with("IGNORE")
+        raise NotImplementedError(
+            "upsert_many is not supported for dialect %s" % dialect_name)
+
+    def _update_values(
+            self, data: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        if isinstance(data, dict):
+            update_data = data
+        else:
+            update_data = data.dict(exclude_unset=True)
+        columns = get_orm_columns(self.model)
+        return {k: v for k, v in update_data.items() if k in columns}
+
+    @crud_operation
     def update(
             self, db: Session, *,
             id: int = None,
@@ -115,39 +1013,112 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         更新操作
 
+        按 id 更新并返回对象时，方言支持 RETURNING 则用一条 UPDATE ... RETURNING
+        取回更新后的行；否则查询、赋值、提交后 refresh
+
         :param db:
         :param id:
         :param obj:
-        :param data:
+        :param data: 只更新模型中存在的列，没有可更新的列时不执行 UPDATE
         :param is_return_obj:
-        :return:
+        :return: 更新行数，或 is_return_obj=True 时更新后的对象(不存在时为 None)
         """
         if not any((id, obj)):
             raise ValueError('At least one of id or obj exists')
-        if isinstance(data, dict):
-            update_data = data
-        else:
-            update_data = data.dict(exclude_unset=True)
+        update_data = self._update_values(data)
+        if not update_data and not obj:
+            # 没有可更新的列(空数据或都不是模型的列)，不发出 SET 为空的 UPDATE
+            return self.get(db, id) if is_return_obj else 0
 
         if not is_return_obj and id:
             update_count = db.query(self.model).filter(
-                self.model.id == id).update(**update_data)
-            db.commit()
+                self.model.id == id).update(update_data)
+            self._commit(db)
+            self._invalidate(db, id)
             return update_count
+        elif not obj and supports_returning(db, "update", self.model):
+            stmt = (
+                update(self.model)
+                .where(self.model.id == id)
+                .values(**update_data)
+                .returning(*self.model.__table__.columns)
+                .execution_options(synchronize_session=False)
+            )
+            row = db.execute(stmt).first()
+            self._commit(db)
+            self._invalidate(db, id)
+            if row is None:
+                return None
+            return self._from_row(db, self._returned_row(row))
         else:
             if not obj:
-                obj = db.query(self.model).filter(
-                    self.model.id == id).first()
-            obj_data = jsonable_encoder(obj)
-
-            for field in obj_data:
-                if field in update_data:
-                    setattr(obj, field, update_data[field])
+                obj = db.query(self.model).get(id)
+                if obj is None:
+                    return None
+            for field, value in update_data.items():
+                setattr(obj, field, value)
             db.add(obj)
-            db.commit()
-            db.refresh(obj)
+            self._commit(db)
+            if not in_batch(db):
+                db.refresh(obj)
+            self._invalidate(db, self._identity(obj))
             return obj
 
+    @crud_operation
+    def update_many(
+            self, db: Session, *,
+            ids: Sequence[Any],
+            data: Union[UpdateSchemaType, Dict[str, Any]],
+            is_return_obj: bool = False
+    ) -> Union[int, List[ModelType]]:
+        """
+        用一条 UPDATE ... WHERE id IN (...) 批量更新多个 id(超过方言参数上限时分块)
+
+        :param db:
+        :param ids:
+        :param data: 所有行更新为相同的值，只更新模型中存在的列，没有可更新的列时不执行 UPDATE
+        :param is_return_obj: 返回更新后的对象列表；方言支持时用 RETURNING，
+            否则更新后用 get_many 一次取回
+        :return: 更新行数，或 is_return_obj=True 时更新后的对象列表(不含不存在的 id)
+        """
+        update_data = self._update_values(data)
+        ids = list(dict.fromkeys(ids))
+        if not update_data:
+            if not is_return_obj:
+                return 0
+            return [obj for obj in self.get_many(db, ids) if obj is not None]
+        returning = is_return_obj and supports_returning(db, "update", self.model)
+        count = 0
+        objs = []
+        for chunk in self._id_chunks(db, ids):
+            stmt = (
+                update(self.model)
+                .where(self.model.id.in_(chunk))
+                .values(**update_data)
+                .execution_options(synchronize_session=False)
+            )
+            if returning:
+                stmt = stmt.returning(*self.model.__table__.columns)
+                rows = db.execute(stmt).all()
+                count += len(rows)
+                objs.extend(self._returned_row(row) for row in rows)
+            else:
+                count += db.execute(stmt).rowcount
+        if not returning:
+            # synchronize_session=False，Session 中已有的对象需要过期后重新加载
+            for id in ids:
+                obj = self._from_identity_map(db, id)
+                if obj is not None:
+                    db.expire(obj)
+        self._commit(db)
+        self._invalidate(db, *ids)
+        if not is_return_obj:
+            return count
+        if returning:
+            return [self._from_row(db, row) for row in objs]
+        return [obj for obj in self.get_many(db, ids) if obj is not None]
+
+    @crud_operation
     def delete(
             self, db: Session, *,
             id: int, is_return_obj: bool = False
@@ -155,18 +1126,38 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """
         删除操作
 
+        方言支持 RETURNING 时，is_return_obj=True 用一条 DELETE ... RETURNING 完成
+
         :param db:
         :param id:
         :param is_return_obj:
-        :return:
+        :return: 删除行数，或 is_return_obj=True 时被删除的对象(不存在时为 None)
         """
-        if is_return_obj:
+        if is_return_obj and supports_returning(db, "delete", self.model):
+            stmt = (
+                delete(self.model)
+                .where(self.model.id == id)
+                .returning(*self.model.__table__.columns)
+                .execution_options(synchronize_session=False)
+            )
+            row = db.execute(stmt).first()
+            current = self._from_identity_map(db, id)
+            if current is not None:
+                db.expunge(current)
+            self._commit(db)
+            self._invalidate(db, id)
+            return None if row is None else self.model(**self._returned_row(row))
+        elif is_return_obj:
             obj = db.query(self.model).get(id)
+            if obj is None:
+                return None
             db.delete(obj)
-            db.commit()
+            self._commit(db)
+            self._invalidate(db, id)
             return obj
         else:
             del_count = db.query(self.model).filter(
                 self.model.id == id).delete()
-            db.commit()
+            self._commit(db)
+            self._invalidate(db, id)
             return del_count
@@ -9,7 +9,6 @@
 """
 import os
 import sys
-sys.path.append(os.path.dirname(os.pardir))
 
 import re
 SYS_ENV = 'win' if re.search('[Ww]in', sys.platform) else 'unix'
@@ -124,7 +123,7 @@ class Logger:
     def get_file_handler_conf(filename: str, level='INFO'):
         file_handler_conf = {
             # 定义写入文件的日志类，此类为按时间分割日志类，还有一些按日志大小分割日志的类等
-            "class": "rbcomm.logger.handlers.TimedRotatingFileHandlerMP",
+            "class": "yz_utils.logger.handlers.TimedRotatingFileHandlerMP",
             # 日志等级
             "level": "",
             # 日志写入格式，因为要写入到文件后期可能会debug用，所以用了较为详细的standard日志格式
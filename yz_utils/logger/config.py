@@ -37,14 +37,11 @@ format: 日志消息格式
 %(message)s         记录的消息
 """
 import os
-import sys
 curr_path = os.path.abspath(os.path.dirname(os.curdir))
-sys.path.append(curr_path)
 # _path = os.path.join(os.path.dirname(os.path.dirname(curr_path)), 'output')
 LOG_PATH = os.path.join(curr_path, 'logs')
 # from app.settings import log_conf
 # LOG_PATH = log_conf.get('log_path')
-print("====>log_path:", LOG_PATH)
 
 LOGGING_CONFIG = {
     "version": 1,
@@ -63,22 +60,22 @@ LOGGING_CONFIG = {
     # 过滤器
     "filters": {
         'debug_filter': {
-            '()': 'rbcomm.logger.filters.DebugFilter'
+            '()': 'yz_utils.logger.filters.DebugFilter'
         },
         'info_filter': {
-            '()': 'rbcomm.logger.filters.InfoFilter'
+            '()': 'yz_utils.logger.filters.InfoFilter'
         },
         'warning_filter': {
-            '()': 'rbcomm.logger.filters.WarningFilter'
+            '()': 'yz_utils.logger.filters.WarningFilter'
         },
         'error_filter': {
-            '()': 'rbcomm.logger.filters.ErrorFilter'
+            '()': 'yz_utils.logger.filters.ErrorFilter'
         },
         'critical_filter': {
-            '()': 'rbcomm.logger.filters.CriticalFilter'
+            '()': 'yz_utils.logger.filters.CriticalFilter'
         },
         'no_debug_filter': {
-            '()': 'rbcomm.logger.filters.NoDebugFilter'
+            '()': 'yz_utils.logger.filters.NoDebugFilter'
         }
     },
     "handlers": {
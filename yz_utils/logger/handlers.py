@@ -20,9 +20,23 @@ logging.handlers.MemoryHandler 日志输出到内存中的制定buffer
 """
 from logging import StreamHandler, FileHandler
 from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
-import fcntl, time, os, codecs, string, re, types, pickle, struct, shutil
+import fcntl, time, os, re, shutil
 from stat import ST_DEV, ST_INO, ST_MTIME
 
+_created_lock_dirs = set()
+
+
+def lock_file_path(lock_dir, filename, levelname):
+    """
+    多进程写同一日志文件时使用的锁文件路径
+        锁目录在第一次写日志时创建，而不是在导入模块时
+    """
+    lock_dir = os.path.abspath(lock_dir)  # 相对路径随当前工作目录变化
+    if lock_dir not in _created_lock_dirs:
+        os.makedirs(lock_dir, exist_ok=True)
+        _created_lock_dirs.add(lock_dir)
+    return lock_dir + '/' + os.path.basename(filename) + '.' + levelname
+
 
 class StreamHandlerMP(StreamHandler):
     """
@@ -70,10 +84,6 @@ class RotatingFileHandlerMP(RotatingFileHandler, FileHandlerMP):
     Based on logging.RotatingFileHandler, modified for Multiprocess
     """
     _lock_dir = '.lock'
-    if os.path.exists(_lock_dir):
-        pass
-    else:
-        os.mkdir(_lock_dir)
 
     def doRollover(self):
         """
@@ -110,7 +120,7 @@ class RotatingFileHandlerMP(RotatingFileHandler, FileHandlerMP):
         try:
             if self.shouldRollover(record):
                 self.doRollover()
-            FileLock = self._lock_dir + '/' + os.path.basename(self.baseFilename) + '.' + record.levelname
+            FileLock = lock_file_path(self._lock_dir, self.baseFilename, record.levelname)
             f = open(FileLock, "w+")
             fcntl.flock(f.fileno(), fcntl.LOCK_EX)
             FileHandlerMP.emit(self, record)
@@ -131,10 +141,6 @@ class TimedRotatingFileHandlerMP(TimedRotatingFileHandler, FileHandlerMP):
     files are kept - the oldest ones are deleted.
     """
     _lock_dir = '.lock'
-    if os.path.exists(_lock_dir):
-        pass
-    else:
-        os.mkdir(_lock_dir)
 
     def __init__(self, filename, when='h', interval=1, backupCount=0, encoding=None, delay=0, utc=0):
         FileHandlerMP.__init__(self, filename, 'a', encoding, delay)
@@ -262,7 +268,7 @@ class TimedRotatingFileHandlerMP(TimedRotatingFileHandler, FileHandlerMP):
         try:
             if self.shouldRollover(record):
                 self.doRollover()
-            FileLock = self._lock_dir + '/' + os.path.basename(self.baseFilename) + '.' + record.levelname
+            FileLock = lock_file_path(self._lock_dir, self.baseFilename, record.levelname)
             f = open(FileLock, "w+")
             fcntl.flock(f.fileno(), fcntl.LOCK_EX)
             FileHandlerMP.emit(self, record)